@@ -0,0 +1,109 @@
+# airports.py - City name -> IATA code resolver shared by every Pack & Play provider
+# Built once per process from the bundled data/cities.tsv: exact names and aliases
+# (Bangalore/Bengaluru, Trichy/Tiruchirappalli, ...) are a dict lookup, and typos fall back to a
+# trigram index shortlisting candidates for difflib. A city that doesn't resolve, or has no usable
+# airport, comes back as a falsy CityMatch so callers skip the Amadeus request altogether.
+
+import difflib
+import functools
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict, namedtuple
+
+CITIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cities.tsv")
+FUZZY_CUTOFF = 0.82  # difflib ratio below which a typo match is rejected
+SHORTLIST = 8        # trigram candidates scored with difflib per lookup
+MEMO_SIZE = 4096     # fuzzy lookups remembered (hits and misses) before the memo is reset
+
+
+def normalize(name):
+    """Casefolded, accent-free, punctuation-free, single-spaced form used as the lookup key."""
+    name = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", " ", name.casefold()).strip()
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class CityMatch(namedtuple("CityMatch", "query city iata match")):
+    """Result of a lookup; `match` is "exact", "alias", "fuzzy" or "none". Falsy when there is no airport."""
+    __slots__ = ()
+
+    def __bool__(self):
+        return self.iata is not None
+
+
+def load_cities(path=CITIES_FILE):
+    """Yield (city, iata or None, [aliases]) rows from the bundled dataset."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            cols = line.rstrip("\n").split("\t")
+            iata = cols[1].strip() if len(cols) > 1 else "-"
+            aliases = [a.strip() for a in cols[2].split(",")] if len(cols) > 2 else []
+            yield cols[0].strip(), None if iata == "-" else iata, [a for a in aliases if a]
+
+
+class CityResolver:
+    """O(1) exact / alias lookup, trigram-shortlisted fuzzy lookup for typos."""
+
+    def __init__(self, rows=None, cutoff=FUZZY_CUTOFF):
+        self.cutoff = cutoff
+        self._exact = {}  # normalized name or alias -> (city, iata, is_alias)
+        for city, iata, aliases in (load_cities() if rows is None else rows):
+            self._exact.setdefault(normalize(city), (city, iata, False))
+            for alias in aliases:
+                self._exact.setdefault(normalize(alias), (city, iata, True))
+        self._keys = list(self._exact)
+        self._index = defaultdict(list)  # trigram -> positions in self._keys
+        for pos, key in enumerate(self._keys):
+            for gram in _trigrams(key):
+                self._index[gram].append(pos)
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def _fuzzy_key(self, key):
+        with self._lock:
+            if key in self._memo:
+                return self._memo[key]
+        votes = Counter(pos for gram in _trigrams(key) for pos in self._index.get(gram, ()))
+        best, best_ratio = None, self.cutoff
+        for pos, _ in votes.most_common(SHORTLIST):
+            ratio = difflib.SequenceMatcher(None, key, self._keys[pos]).ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = self._keys[pos], ratio
+        with self._lock:
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[key] = best
+        return best
+
+    def resolve(self, name):
+        """Return a CityMatch for `name`; check it with `if match:` before calling a provider."""
+        key = normalize(name)
+        if not key:
+            return CityMatch(name, None, None, "none")
+        hit = self._exact.get(key)
+        how = "alias" if hit and hit[2] else "exact"
+        if hit is None:
+            fuzzy = self._fuzzy_key(key)
+            if fuzzy is None:
+                return CityMatch(name, None, None, "none")
+            hit, how = self._exact[fuzzy], "fuzzy"
+        city, iata, _ = hit
+        return CityMatch(name, city, iata, how)
+
+    def iata(self, name):
+        """IATA code for `name`, or None when it has no (known) airport."""
+        return self.resolve(name).iata
+
+
+@functools.lru_cache(maxsize=None)
+def get_city_resolver():
+    """The process-wide resolver, built from data/cities.tsv on first use."""
+    return CityResolver()
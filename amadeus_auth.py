@@ -0,0 +1,63 @@
+# amadeus_auth.py - Shared Amadeus OAuth token for Pack & Play
+# One provider per set of credentials, created once per process (see get_amadeus in pipeline.py).
+
+import threading
+import time
+import http_transport
+
+AUTH_URL = "https://test.api.amadeus.com/v1/security/oauth2/token"
+
+
+class AmadeusTokenProvider:
+    """Caches the client-credentials access token and refreshes it shortly before it expires."""
+
+    def __init__(self, client_id, client_secret, auth_url=AUTH_URL, refresh_margin=60):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.auth_url = auth_url
+        self.refresh_margin = refresh_margin  # seconds before expires_in at which we fetch a new token
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _valid(self):
+        return self._token is not None and time.monotonic() < self._expires_at - self.refresh_margin
+
+    def _authenticate(self):
+        data = {"grant_type": "client_credentials", "client_id": self.client_id, "client_secret": self.client_secret}
+        res = http_transport.post(self.auth_url, data=data)
+        if res.status_code != 200:
+            return None
+        body = res.json()
+        self._token = body["access_token"]
+        self._expires_at = time.monotonic() + float(body.get("expires_in", 1799))
+        return self._token
+
+    def token(self):
+        """Return a valid access token, or None if authentication fails."""
+        if self._valid():
+            return self._token
+        with self._lock:
+            # Another session may have refreshed while we waited for the lock.
+            if self._valid():
+                return self._token
+            return self._authenticate()
+
+    def invalidate(self, token):
+        """Drop `token` if it is still the cached one (e.g. after a 401)."""
+        with self._lock:
+            if self._token == token:
+                self._token = None
+                self._expires_at = 0.0
+
+    def get(self, url, headers=None, **kwargs):
+        """GET `url` with the bearer token; re-authenticates once on 401. Returns None if no token is available."""
+        for attempt in range(2):
+            token = self.token()
+            if not token:
+                return None
+            res = http_transport.get(url, headers={**(headers or {}), "Authorization": f"Bearer {token}"}, **kwargs)
+            if res.status_code != 401 or attempt:
+                return res
+            res.close()  # callers may stream; don't hold the pooled connection until garbage collection
+            self.invalidate(token)
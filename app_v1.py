@@ -1,277 +1,145 @@
 # app.py - Pack & Play Travel Chatbot with RAG + APIs + LLM
 # Run in VSCode: streamlit run app.py
 # No secrets.toml needed: API keys hardcoded as placeholders—replace with your own!
-# OpenRouter: Replace 'your-openrouter-api-key-here' below.
+# OpenRouter: Replace the OPENROUTER_API_KEY default below.
 # Google Maps: Buses skipped unless you add your key (optional).
 
 import streamlit as st
+import logging
 import os
-import re
-from datetime import timedelta, datetime
-import numpy as np
-import feedparser
-import requests
-import spacy
-from dateparser.search import search_dates
-import tiktoken
-from openai import OpenAI
-
-# LLM Setup (hardcoded key—replace!)
-@st.cache_resource
-def init_llm():
-    api_key = "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"  # Replace with your actual OpenRouter key!
-    if api_key == "your-openrouter-api-key-here":
-        st.error("Replace 'your-openrouter-api-key-here' in app.py with your OpenRouter API key!")
-        st.stop()
-    base_url = 'https://openrouter.ai/api/v1'
-    client = OpenAI(api_key=api_key, base_url=base_url)
-    model = 'deepseek/deepseek-chat-v3-0324'
-    return client, model
-
-# SpaCy Setup
-@st.cache_resource
-def init_spacy():
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import warmup
+import weather
+from weather import get_weather_emoji
+from caching import describe_age, single_flight, swr_cache
+
+# Providers, caches, prompt building and the LLM client live in pipeline.py (shared with app_v3 and
+# service.py). This app only renders, and prices its hotels. The credentials below are its defaults
+# for pipeline's get_llm / get_amadeus; the environment still wins, and they must be set before the import.
+os.environ.setdefault("OPENROUTER_API_KEY", "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")  # Replace with your actual OpenRouter key!
+os.environ.setdefault("AMADEUS_CLIENT_ID", "PdGKUOnybGoAzwjfP4xg93lD3pv2L89k")
+os.environ.setdefault("AMADEUS_CLIENT_SECRET", "z39TseJgdeG0w2Oh")
+
+import pipeline
+from pipeline import PROMPT_BUDGET, get_amadeus, get_llm, get_nlp, get_response_cache, relevant_news
+
+init_llm = get_llm
+init_spacy = get_nlp
+log = logging.getLogger("packplay")
+
+# Hotels API: pipeline's by-city list, priced here (offers fetched in batches of hotelIds instead of one request per hotel)
+HOTEL_CANDIDATES = 20   # by-city results we price before picking the top ones
+HOTEL_OFFER_BATCH = 10  # hotelIds per /v3/shopping/hotel-offers request
+
+def _fetch_hotel_offers(amadeus, hotel_ids):
+    """Return {hotelId: price dict} for one comma-separated hotel-offers request."""
+    offer_url = f"{pipeline.AMADEUS_URL}/v3/shopping/hotel-offers?hotelIds={','.join(hotel_ids)}"
+    offer_res = amadeus.get(offer_url)
+    if offer_res is None: return {}
+    # Per-hotel failures come back in "errors" next to the hotels that did price, so keep "data" regardless.
+    prices = {}
+    for item in offer_res.json().get("data", []):
+        hotel_id, offers = item.get("hotel", {}).get("hotelId"), item.get("offers")
+        if hotel_id and offers: prices[hotel_id] = offers[0]["price"]
+    return prices
+
+@swr_cache(soft_ttl=pipeline.HOTELS_TTL, hard_ttl=pipeline.HOTELS_MAX_AGE)
+@single_flight
+def _priced_hotels(city, vegetarian=False):
     try:
-        return spacy.load("en_core_web_trf")
-    except:
-        return spacy.load("en_core_web_sm")
-
-# Helpers (unchanged)
-_WORD_NUM = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
-def _word_to_int(s):
-    s = s.lower().strip()
-    if s.isdigit(): return int(s)
-    return _WORD_NUM.get(s)
-
-def _extract_duration_days(text):
-    patterns = [r'for\s+(\d+)\s+days?', r'for\s+([a-zA-Z]+)\s+days?', r'(\d+)[-\s]?day', r'([a-zA-Z]+)[-\s]?day',
-                r'for\s+(\d+)\s+nights?', r'for\s+([a-zA-Z]+)\s+nights?']
-    for p in patterns:
-        m = re.search(p, text, re.I)
-        if m:
-            token = m.group(1)
-            val = int(token) if token.isdigit() else _word_to_int(token)
-            if val: return val
-    return None
-
-# Trip Parser (unchanged)
-def extract_trip_details(text, nlp, prefer_future_dates=True):
-    if not text: return {"source": None, "destination": None, "start_date": None, "return_date": None, "duration_days": None}
-    doc = nlp(text)
-    gpes = [ent.text for ent in doc.ents if ent.label_ in ("GPE", "LOC", "FAC")]
-    src = dst = None
-    text_stripped = text.strip()
-
-    m = re.search(r'\bfrom\s+([A-Z][a-zA-Z\s]{1,60}?)\s+(?:to|->|-)\s+([A-Z][a-zA-Z\s]{1,60}?)\b', text_stripped)
-    if m: src, dst = m.group(1).strip().title(), m.group(2).strip().title()
-    else:
-        m2 = re.search(r'\b([A-Z][a-zA-Z\s]{1,60}?)\s+(?:to|->|-)\s+([A-Z][a-zA-Z\s]{1,60}?)\b', text_stripped)
-        if m2: src, dst = m2.group(1).strip().title(), m2.group(2).strip().title()
-
-    if not src and gpes: src = gpes[0].title()
-    if not dst and len(gpes) > 1: dst = gpes[1].title()
-    elif len(gpes) == 1 and re.search(r'\b(to|visit|going to|trip to)\s+' + re.escape(gpes[0]), text, re.I):
-        dst = gpes[0].title()
-
-    dp_settings = {'PREFER_DATES_FROM': 'future'} if prefer_future_dates else {}
-    try: sd = search_dates(text, settings=dp_settings) or []
-    except: sd = []
-    full_lower = text.lower()
-    found = [(full_lower.find(mtext.lower()), mtext, dt) for mtext, dt in sd if full_lower.find(mtext.lower()) != -1]
-    found.sort(key=lambda x: x[0])
-    start_date = return_date = None
-    duration = _extract_duration_days(text)
-
-    if len(found) >= 2:
-        start_date, return_date = found[0][2], found[1][2]
-    elif len(found) == 1:
-        start_date = found[0][2]
-        if duration: return_date = start_date + timedelta(days=duration)
-
-    if start_date and return_date and not duration:
-        duration = (return_date - start_date).days
-
-    return {"source": src, "destination": dst, "start_date": start_date, "return_date": return_date, "duration_days": duration}
-
-# Weather API (unchanged)
-@st.cache_data(ttl=1800)
-def get_weather(city):
-    geo_url = f"https://geocoding-api.open-meteo.com/v1/search?name={requests.utils.quote(city)}&count=1&language=en&format=json"
-    try: geo = requests.get(geo_url, timeout=6).json()
-    except: return None
-    if not geo.get("results"): return None
-    result = geo["results"][0]
-    lat, lon = result["latitude"], result["longitude"]
-    weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true&daily=temperature_2m_max,temperature_2m_min"
-    try: weather = requests.get(weather_url, timeout=6).json()
-    except: return result, None
-    return result, weather
-
-def get_weather_emoji(code):
-    mapping = {0: "☀️ Sunny", 1: "☀️ Sunny", 2: "⛅ Partly Cloudy", 3: "⛅ Partly Cloudy", 45: "🌫 Foggy", 48: "🌫 Foggy",
-               51: "🌦 Drizzle", 53: "🌦 Drizzle", 55: "🌦 Drizzle", 61: "🌧 Rainy", 63: "🌧 Rainy", 65: "🌧 Rainy",
-               71: "❄️ Snowy", 73: "❄️ Snowy", 75: "❄️ Snowy", 95: "⛈ Thunderstorm", 96: "⛈ Thunderstorm", 99: "⛈ Thunderstorm"}
-    return mapping.get(code, "☁️ Cloudy")
-
-# Hotels API (unchanged)
-@st.cache_data(ttl=3600)
-def get_hotels_by_city(city):
-    try:
-        auth_url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-        auth_data = {"grant_type": "client_credentials", "client_id": "PdGKUOnybGoAzwjfP4xg93lD3pv2L89k", "client_secret": "z39TseJgdeG0w2Oh"}
-        auth_res = requests.post(auth_url, data=auth_data)
-        if auth_res.status_code != 200: return []
-        token = auth_res.json()["access_token"]
-
-        CITY_TO_IATA = {"Chennai": "MAA", "Trichy": "TRZ", "Goa": "GOI", "Delhi": "DEL", "Mumbai": "BOM", "Hyderabad": "HYD", "Kolkata": "CCU", "Bengaluru": "BLR", "Kodaikanal": "IXM"}  # Madurai for Kodaikanal
-        iata = CITY_TO_IATA.get(city.title(), city[:3].upper())
-
-        loc_url = f"https://test.api.amadeus.com/v1/reference-data/locations/hotels/by-city?cityCode={iata}"
-        headers = {"Authorization": f"Bearer {token}"}
-        loc_res = requests.get(loc_url, headers=headers).json()
-        hotels = loc_res.get("data", [])
+        hotels = [h for h in pipeline.get_hotels_by_city(city, vegetarian, limit=HOTEL_CANDIDATES).value if h.get("id")]
         if not hotels: return []
 
-        results = []
-        for h in hotels[:3]:
-            name = h.get("name", "Unknown")
-            address = ", ".join(filter(None, h.get("address", {}).get("lines", []) + [h.get("address", {}).get("cityName", "")]))
-            hotel_id = h["hotelId"]
-            offer_url = f"https://test.api.amadeus.com/v3/shopping/hotel-offers?hotelIds={hotel_id}"
-            offer_res = requests.get(offer_url, headers=headers).json()
-            if "errors" not in offer_res and offer_res.get("data"):
-                offer = offer_res["data"][0]
-                price = offer["offers"][0]["price"]["total"]
-                results.append({"name": name, "price": f"{price} {offer['offers'][0]['price']['currency']}", "address": address})
-        return results
-    except Exception as e:
-        st.error(f"Hotel API error: {e}")
-        return []
-
-# Flights API (unchanged)
-@st.cache_data(ttl=3600)
-def get_flights_by_route(source, destination, date=None):
-    try:
-        auth_url = "https://test.api.amadeus.com/v1/security/oauth2/token"
-        auth_data = {"grant_type": "client_credentials", "client_id": "PdGKUOnybGoAzwjfP4xg93lD3pv2L89k", "client_secret": "z39TseJgdeG0w2Oh"}
-        auth_res = requests.post(auth_url, data=auth_data)
-        if auth_res.status_code != 200: return []
-        token = auth_res.json()["access_token"]
-
-        CITY_TO_IATA = {"Chennai": "MAA", "Trichy": "TRZ", "Goa": "GOI", "Delhi": "DEL", "Mumbai": "BOM", "Hyderabad": "HYD", "Kolkata": "CCU", "Bengaluru": "BLR", "Kodaikanal": "IXM", "Virudhunagar": "VGA"}
-        origin, dest = CITY_TO_IATA.get(source.title()), CITY_TO_IATA.get(destination.title())
-        if not (origin and dest): return []
-
-        date_str = (date or datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-        url = f"https://test.api.amadeus.com/v2/shopping/flight-offers?originLocationCode={origin}&destinationLocationCode={dest}&departureDate={date_str}&adults=1"
-        headers = {"Authorization": f"Bearer {token}"}
-        res = requests.get(url, headers=headers).json()
-        if "errors" in res: return []
+        ids = [h["id"] for h in hotels]
+        batches = [ids[i:i + HOTEL_OFFER_BATCH] for i in range(0, len(ids), HOTEL_OFFER_BATCH)]
+        prices = {}
+        if len(batches) == 1:
+            prices.update(_fetch_hotel_offers(get_amadeus(), batches[0]))
+        else:
+            with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+                for batch_prices in pool.map(partial(_fetch_hotel_offers, get_amadeus()), batches):
+                    prices.update(batch_prices)
 
-        flights = []
-        for item in res.get("data", [])[:2]:
-            price = item["price"]["total"]
-            segments = item["itineraries"][0]["segments"]
-            stops = len(segments) - 1
-            flights.append({"type": f"{stops} stops", "price": f"{price} {item['price']['currency']}"})
-        return flights
+        # keep the by-city ordering, unpriced hotels dropped
+        return [dict(h, price=f"{prices[h['id']]['total']} {prices[h['id']]['currency']}") for h in hotels if prices.get(h["id"])]
     except Exception as e:
-        st.error(f"Flight API error: {e}")
+        log.warning("Hotel API error: %s", e)  # runs on a provider thread: no st.* here
         return []
 
-# Bus API (hardcoded fallback—no secrets)
+def get_hotels_by_city(city, vegetarian=False, limit=3):
+    """pipeline.get_hotels_by_city with prices: the hotels provider passed to pipeline.fetch_all_apis."""
+    hotels = _priced_hotels(city, vegetarian)
+    return hotels._replace(value=(hotels.value or [])[:limit])
 
-
-# RAG News (unchanged, destination-specific)
-@st.cache_data(ttl=1800)
-def fetch_news(destination, max_articles=5):
-    rss_url = f"https://news.google.com/rss/search?q={destination}+travel+tourism&hl=en-IN&gl=IN&ceid=IN:en&when=7d"
-    feed = feedparser.parse(rss_url)
-    articles = []
-    for entry in feed.entries[:max_articles]:
-        articles.append({
-            'title': entry.title,
-            'summary': entry.get('summary', '')[:300] + '...' if entry.get('summary') else '',
-            'link': entry.link
-        })
-    return articles
-
-def simple_retrieve(query, articles, top_k=3):
-    query_words = set(query.lower().split())
-    scored = []
-    for art in articles:
-        art_words = set((art['title'] + ' ' + art['summary']).lower().split())
-        score = len(query_words.intersection(art_words))
-        scored.append((score, art))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [art for _, art in scored[:top_k]]
-
-# API Aggregator (updated bus display)
-def fetch_all_apis(trip, client, model):
+# Rendering of the provider results pipeline.fetch_all_apis used for the prompt
+def _render_providers(trip, results, user_input):
     dest = trip['destination']
-    src = trip['source']
-    start_date = trip['start_date']
-    context_parts = []
 
-    # Weather
-    with st.spinner("Fetching weather..."):
-        w = get_weather(dest)
-        if w:
-            loc, weather = w
-            cw = weather.get('current_weather', {})
-            temp = cw.get('temperature', 'N/A')
-            code = cw.get('weathercode', 0)
-            forecast = weather.get('daily', {})
-            max_temp = forecast.get('temperature_2m_max', [None])[0]
-            context_parts.append(f"Weather in {dest}: Current {get_weather_emoji(code)} {temp}°C. Forecast high: {max_temp}°C.")
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("Current Temp", f"{temp}°C", f"{get_weather_emoji(code)}")
-            with col2:
-                st.metric("Forecast High", f"{max_temp}°C")
+    # Weather (every trip day at the destination)
+    w = results.get("weather")
+    if not weather.trip_window(trip['start_date'], trip['return_date'], trip['duration_days']):
+        st.caption(f"🌤 No forecast yet for {dest}: the trip starts more than {weather.FORECAST_DAYS} days from now.")
+    elif w and w.value:
+        for city, days in w.value:
+            if city != dest: continue
+            cols = st.columns(min(len(days), 7) or 1)
+            for col, d in zip(cols, days):
+                with col:
+                    st.metric(weather.day_label(d.date), f"{d.tmax:.0f}°C" if d.tmax is not None else "N/A", get_weather_emoji(d.code), delta_color="off")
+        st.caption(f"🕒 Weather updated {describe_age(w.fetched_at)}")
 
     # News (RAG)
-    with st.spinner("Fetching news..."):
-        news = fetch_news(dest)
-        relevant_news = simple_retrieve(trip['destination'] or '', news)
-        news_context = "\n".join([f"News: {n['title']} - {n['summary']} (Source: {n['link']})" for n in relevant_news])
-        if news_context: context_parts.append(f"Recent News: {news_context}")
-        if relevant_news:
-            st.subheader("📰 Recent News")
-            for n in relevant_news:
-                st.write(f"**{n['title']}**")
-                st.caption(n['summary'])
-                st.caption(f"[Source]({n['link']})")
-                st.divider()
+    news = relevant_news(trip, results.get("news"), user_input)
+    if news:
+        st.subheader("📰 Recent News")
+        st.caption(f"🕒 Feed updated {describe_age(results['news'].fetched_at)}")
+        for n in news:
+            st.write(f"**{n['title']}**")
+            st.caption(n['summary'])
+            st.caption(f"[Source]({n['link']})")
+            st.divider()
 
     # Hotels
-    with st.spinner("Fetching hotels..."):
-        hotels = get_hotels_by_city(dest)
-        if hotels:
-            hotel_str = " | ".join([f"{h['name']} ({h['price']})" for h in hotels])
-            context_parts.append(f"Hotel Options in {dest}: {hotel_str}")
-            st.subheader("🏨 Hotel Options")
-            for h in hotels:
-                st.write(f"**{h['name']}** - 💵 {h['price']}")
-                st.caption(f"📍 {h['address']}")
+    hotels = results["hotels"].value if results.get("hotels") else None
+    if hotels:
+        st.subheader("🏨 Hotel Options")
+        for h in hotels:
+            st.write(f"**{h['name']}** - 💵 {h['price']}")
+            st.caption(f"📍 {h['address']}")
+        st.caption(f"🕒 Prices updated {describe_age(results['hotels'].fetched_at)}")
 
     # Flights
-    if src and dest:
-        with st.spinner("Fetching flights..."):
-            flights = get_flights_by_route(src, dest, start_date)
-            if flights:
-                flight_str = " | ".join([f"{f['type']}: {f['price']}" for f in flights])
-                context_parts.append(f"Flight Options from {src} to {dest}: {flight_str}")
-                st.subheader("✈️ Flight Options")
-                for f in flights:
-                    st.write(f"**{f['type']}** - 💰 {f['price']}")
-
-    return "\n\n".join(context_parts) if context_parts else "No additional data available."
-
-# LLM Generation (unchanged)
-def generate_travel_response(user_input, client, model, nlp):
-    trip = extract_trip_details(user_input, nlp)
-    
+    flights = results.get("flights")
+    if flights:
+        st.subheader("✈️ Flight Options")
+        for f in flights:
+            st.write(f"✈️ {f.describe()}")
+
+# Streaming completion (renders tokens as they arrive, records TTFT and tokens/sec)
+STREAM_LLM = True
+
+def _stream_reply(deltas, stats, render):
+    """Render streamed reply deltas through render(text_so_far); returns (full_text, stats)."""
+    parts = []
+    for delta in deltas:
+        parts.append(delta)
+        render("".join(parts) + "▌")
+    text = "".join(parts)
+    render(text)
+
+    metrics = st.session_state.setdefault("llm_metrics", [])
+    metrics.append(stats)
+    del metrics[:-50]
+    return text, stats
+
+def _stats_caption(stats):
+    ttft = f"{stats['ttft_s']:.2f}s" if stats.get('ttft_s') is not None else "n/a"
+    tps = f"{stats['tokens_per_s']:.1f}" if stats.get('tokens_per_s') else "n/a"
+    return f"⏱ First token {ttft} · {stats.get('completion_tokens', 0)} tokens · {tps} tokens/s"
+
+def _render_trip(trip):
     st.subheader("✨ Parsed Trip Details")
     col1, col2 = st.columns(2)
     with col1:
@@ -288,66 +156,59 @@ def generate_travel_response(user_input, client, model, nlp):
         else:
             st.warning("**Return Date:** Not detected")
 
+# LLM Generation (streams by default): parsing, providers, prompt, cache and LLM are pipeline.generate_travel_response
+def generate_travel_response(user_input, client, model, nlp, stream=STREAM_LLM):
+    with st.spinner("Fetching weather, news, hotels and flights..."):
+        result = pipeline.generate_travel_response(user_input, stream=stream, nlp=nlp, client=client, model=model,
+                                                   get_hotels=get_hotels_by_city)
+    trip = result["trip"]
+    _render_trip(trip)
+
     if not trip['destination']:
         st.warning("No destination detected—try rephrasing!")
         return
 
-    api_context = fetch_all_apis(trip, client, model)
+    _render_providers(trip, result["results"], user_input)
+    report = result["report"]
+    trimmed = report["dropped"] + report["shortened"]
+    st.caption(f"🧮 Prompt: {result['prompt_tokens']}/{PROMPT_BUDGET} tokens" + (f" (trimmed: {', '.join(trimmed)})" if trimmed else ""))
 
-    system_prompt = "You are a helpful travel assistant. Use the parsed trip details and provided context (news, weather, flights, hotels) to create a concise, personalized itinerary. Include tips, costs, and warnings. Structure: Overview, Itinerary, Recommendations."
-    
-    user_prompt = f"""
-    User Plan: {user_input}
-    
-    Parsed Details: Source: {trip['source']}, Destination: {trip['destination']}, 
-    Start: {trip['start_date'].strftime('%Y-%m-%d') if trip['start_date'] else 'N/A'}, 
-    Return: {trip['return_date'].strftime('%Y-%m-%d') if trip['return_date'] else 'N/A'}, 
-    Duration: {trip['duration_days']} days.
-    
-    Context from APIs & News: {api_context}
-    
-    Generate a helpful response.
-    """
-    
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_prompt}
-    ]
-    
-    encoding = tiktoken.get_encoding("cl100k_base")
-    prompt_tokens = len(encoding.encode("\n".join([m['content'] for m in messages])))
-    if prompt_tokens > 3000:
-        user_prompt = user_prompt[:2000]
-        messages[1]['content'] = user_prompt
-        st.warning("Prompt truncated for token limit.")
+    st.subheader("🤖 Personalized Itinerary")
+    if result["cached"]:
+        text = "".join(result["reply"]) if stream else result["reply"]
+        st.markdown(text)
+        st.caption(f"⚡ From the itinerary cache (hit rate {get_response_cache().stats()['hit_rate']:.0%})")
+        return text
 
-    with st.spinner("Generating personalized itinerary..."):
-        response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            max_tokens=800,
-            temperature=0.7,
-        )
-    
-    return response.choices[0].message.content
+    if stream:
+        text, stats = _stream_reply(result["reply"], result["stats"], st.empty().markdown)
+        st.caption(_stats_caption(stats))
+        return text
+
+    text = result["reply"]
+    st.markdown(text)
+    return text
 
 # Streamlit UI (no secrets checks)
 st.set_page_config(page_title="Pack & Play - Travel Chatbot", page_icon="🧳", layout="wide")
+warmup.start(init_spacy)  # background spaCy / dateparser / tiktoken warm-up; once per process, reruns are no-ops
 st.title("🧳 Pack & Play — Travel Chatbot")
 st.markdown("Type your travel plan in natural language. Example: `I am planning to go to Kodaikanal from Chennai on 31st Oct for 3 days`")
 
+if not warmup.finished():
+    st.caption("⏳ Warming up the language models — the first plan may take a little longer.")
+
 user_input = st.text_input("Enter travel plan:", placeholder="e.g., Trip Chennai to Kodaikanal 31 Oct - 2 Nov")
 
 if st.button("🚀 Parse & Plan", type="primary"):
     if not user_input:
         st.warning("Please enter a travel plan first.")
     else:
+        t0 = time.perf_counter()
         client, model = init_llm()
         nlp = init_spacy()
-        full_response = generate_travel_response(user_input, client, model, nlp)
-        
-        st.subheader("🤖 Personalized Itinerary")
-        st.markdown(full_response)
+        full_response = generate_travel_response(user_input, client, model, nlp)  # renders the itinerary itself
+        warmup.record_request(time.perf_counter() - t0)
 
 st.markdown("---")
 st.caption("Powered by Streamlit, OpenRouter, Amadeus, Open-Meteo & Google News. Tip: Use future dates for best results!")
@@ -2,12 +2,9 @@ import streamlit as st
 import os
 import re
 from datetime import timedelta, datetime
-import numpy as np
-import feedparser
 import requests
-import spacy
-from dateparser.search import search_dates
-from openai import OpenAI
+import http_transport
+from airports import get_city_resolver
 
 # ==============================================
 # 🧩 INITIALIZATION (SECURE)
@@ -18,6 +15,7 @@ def init_llm():
     """Initialize LLM client using Streamlit secrets."""
     api_key = st.secrets["OPENROUTER_API_KEY"]
     base_url = st.secrets.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+    from openai import OpenAI  # heavy imports are deferred to first use, see warmup.py
     client = OpenAI(api_key=api_key, base_url=base_url)
     model = "deepseek/deepseek-chat-v3-0324"
     return client, model
@@ -25,6 +23,7 @@ def init_llm():
 @st.cache_resource
 def init_spacy():
     """Load spaCy NLP model efficiently."""
+    import spacy
     try:
         return spacy.load("en_core_web_trf")
     except:
@@ -91,6 +90,7 @@ def extract_trip_details(text, nlp, prefer_future_dates=True):
         dst = gpes[1].title()
 
     # Date extraction
+    from dateparser.search import search_dates
     dp_settings = {'PREFER_DATES_FROM': 'future'} if prefer_future_dates else {}
     try:
         sd = search_dates(text, settings=dp_settings) or []
@@ -126,9 +126,8 @@ def get_weather(city):
     if not city:
         return None
     try:
-        geo = requests.get(
-            f"https://geocoding-api.open-meteo.com/v1/search?name={requests.utils.quote(city)}&count=1&language=en&format=json",
-            timeout=6).json()
+        geo = http_transport.get(
+            f"https://geocoding-api.open-meteo.com/v1/search?name={requests.utils.quote(city)}&count=1&language=en&format=json").json()
     except:
         return None
     if not geo.get("results"):
@@ -136,9 +135,8 @@ def get_weather(city):
 
     result = geo["results"][0]
     lat, lon = result["latitude"], result["longitude"]
-    weather = requests.get(
-        f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true&daily=temperature_2m_max,temperature_2m_min",
-        timeout=6).json()
+    weather = http_transport.get(
+        f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&current_weather=true&daily=temperature_2m_max,temperature_2m_min").json()
     return result, weather
 
 def get_weather_emoji(code):
@@ -161,22 +159,21 @@ def get_hotels_by_city(city, vegetarian=False):
     client_secret = st.secrets["AMADEUS_CLIENT_SECRET"]
 
     try:
-        token_res = requests.post(
+        iata = get_city_resolver().iata(city)
+        if not iata:
+            return []  # no airport / unknown city: skip both the token and the hotel request
+
+        token_res = http_transport.post(
             "https://test.api.amadeus.com/v1/security/oauth2/token",
-            data={"grant_type": "client_credentials", "client_id": client_id, "client_secret": client_secret},
-            timeout=6)
+            data={"grant_type": "client_credentials", "client_id": client_id, "client_secret": client_secret})
         token = token_res.json().get("access_token")
         if not token:
             return []
 
-        CITY_TO_IATA = {"Chennai": "MAA", "Goa": "GOI", "Delhi": "DEL", "Mumbai": "BOM",
-                        "Hyderabad": "HYD", "Kolkata": "CCU", "Bengaluru": "BLR"}
-        iata = CITY_TO_IATA.get(city.title(), city[:3].upper())
-
         headers = {"Authorization": f"Bearer {token}"}
-        res = requests.get(
+        res = http_transport.get(
             f"https://test.api.amadeus.com/v1/reference-data/locations/hotels/by-city?cityCode={iata}",
-            headers=headers, timeout=6).json()
+            headers=headers).json()
         hotels = res.get("data", [])[:3]
 
         result = []
@@ -205,25 +202,23 @@ def get_flights_by_route(source, destination, date=None):
     client_id = st.secrets["AMADEUS_CLIENT_ID"]
     client_secret = st.secrets["AMADEUS_CLIENT_SECRET"]
     try:
-        token_res = requests.post(
+        resolver = get_city_resolver()
+        origin, dest = resolver.iata(source), resolver.iata(destination)
+        if not (origin and dest) or origin == dest:
+            return []
+
+        token_res = http_transport.post(
             "https://test.api.amadeus.com/v1/security/oauth2/token",
-            data={"grant_type": "client_credentials", "client_id": client_id, "client_secret": client_secret},
-            timeout=6)
+            data={"grant_type": "client_credentials", "client_id": client_id, "client_secret": client_secret})
         token = token_res.json().get("access_token")
         if not token:
             return []
 
-        CITY_TO_IATA = {"Chennai": "MAA", "Goa": "GOI", "Delhi": "DEL", "Mumbai": "BOM",
-                        "Hyderabad": "HYD", "Kolkata": "CCU", "Bengaluru": "BLR"}
-        origin, dest = CITY_TO_IATA.get(source.title()), CITY_TO_IATA.get(destination.title())
-        if not (origin and dest):
-            return []
-
         date_str = (date or datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
         headers = {"Authorization": f"Bearer {token}"}
-        res = requests.get(
+        res = http_transport.get(
             f"https://test.api.amadeus.com/v2/shopping/flight-offers?originLocationCode={origin}&destinationLocationCode={dest}&departureDate={date_str}&adults=1",
-            headers=headers, timeout=6).json()
+            headers=headers).json()
         flights = []
         for f in res.get("data", [])[:2]:
             price = f["price"]["total"]
@@ -240,8 +235,12 @@ def get_flights_by_route(source, destination, date=None):
 
 @st.cache_data(ttl=1800)
 def fetch_news(destination, max_articles=3):
+    import feedparser
     rss_url = f"https://news.google.com/rss/search?q={destination}+travel&hl=en-IN&gl=IN&ceid=IN:en"
-    feed = feedparser.parse(rss_url)
+    try:
+        feed = feedparser.parse(http_transport.get(rss_url).content)
+    except requests.RequestException:
+        return []
     return [{"title": e.title, "link": e.link} for e in feed.entries[:max_articles]]
 
 
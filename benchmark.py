@@ -0,0 +1,348 @@
+# benchmark.py - Offline end-to-end benchmark for the Pack & Play pipeline
+# Starts local stub servers that replay the recorded provider responses in data/recorded/
+# (Open-Meteo, Amadeus, Google News, OpenRouter), points pipeline.py at them and drives
+# extract_trip_details, fetch_all_apis and generate_travel_response over data/bench_messages.txt,
+# then reports startup (import, warm-up, first request) and p50/p95/p99 latency per stage plus overall throughput. No network needed, apart
+# from the spaCy model and the tiktoken encoding already being installed / cached locally.
+#
+#   python benchmark.py
+#   python benchmark.py --latency 120 --jitter 40 --error-rate 0.02 --concurrency 8 --rounds 3
+#   python benchmark.py --latency llm=800 --token-ms 15 --stream --cold   # per-provider override
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RECORDED_DIR = os.path.join(HERE, "data", "recorded")
+MESSAGES_PATH = os.path.join(HERE, "data", "bench_messages.txt")
+PROVIDERS = ("open_meteo", "amadeus", "news", "llm")
+STAGES = ("parse", "fetch_all_apis", "generate", "end_to_end")
+
+# ========== PROVIDER STUBS ==========
+
+def _recorded(name):
+    with open(os.path.join(RECORDED_DIR, name), "rb") as f:
+        return f.read()
+
+
+class StubProvider:
+    """A local HTTP server answering with recorded responses after an injected delay, or a 503."""
+
+    def __init__(self, name, routes, latency_ms=0, jitter_ms=0, error_rate=0.0, token_ms=0, seed=None):
+        self.name = name
+        self.routes = routes  # (method, path suffix) -> handler(query, body) -> (status, content_type, body)
+        self.latency_ms, self.jitter_ms, self.error_rate, self.token_ms = latency_ms, jitter_ms, error_rate, token_ms
+        self.requests = self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real providers
+
+            def do_GET(self):
+                stub._serve(self, "GET")
+
+            def do_POST(self):
+                stub._serve(self, "POST")
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _delay_and_fail(self):
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        time.sleep(delay)
+        return fail
+
+    def _serve(self, handler, method):
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length) if length else b""
+        url = urlparse(handler.path)
+        route = next((fn for (m, suffix), fn in self.routes.items() if m == method and url.path.endswith(suffix)), None)
+        if self._delay_and_fail():
+            status, ctype, payload = 503, "application/json", b'{"error": "injected failure"}'
+        elif route is None:
+            status, ctype, payload = 404, "application/json", b'{"error": "no recorded response"}'
+        else:
+            status, ctype, payload = route(parse_qs(url.query), body)
+
+        handler.send_response(status)
+        handler.send_header("Content-Type", ctype)
+        if isinstance(payload, bytes):
+            handler.send_header("Content-Length", str(len(payload)))
+            handler.end_headers()
+            handler.wfile.write(payload)
+            return
+        handler.send_header("Connection", "close")  # streamed body ends when the connection does
+        handler.end_headers()
+        handler.close_connection = True
+        for chunk in payload:
+            handler.wfile.write(chunk)
+            handler.wfile.flush()
+            if self.token_ms:
+                time.sleep(self.token_ms / 1000)
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name=f"stub-{self.name}", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def _json_route(name):
+    payload = _recorded(name)
+    return lambda query, body: (200, "application/json", payload)
+
+
+def _geocode(query, body):
+    data = json.loads(_recorded("open_meteo_geocode.json"))
+    data["results"][0]["name"] = query.get("name", ["Goa"])[0].title()
+    return 200, "application/json", json.dumps(data).encode()
+
+
+def _forecast(query, body):
+    """The recorded daily forecast replayed for each requested location over the requested dates."""
+    recorded = json.loads(_recorded("open_meteo_forecast.json"))
+    lats, lons = query.get("latitude", ["0"])[0].split(","), query.get("longitude", ["0"])[0].split(",")
+    start = date.fromisoformat(query.get("start_date", [date.today().isoformat()])[0])
+    end = date.fromisoformat(query.get("end_date", [start.isoformat()])[0])
+    n_days = (end - start).days + 1
+    variables = query.get("daily", [""])[0].split(",")
+    out = []
+    for lat, lon in zip(lats, lons):
+        daily = {"time": [(start + timedelta(days=i)).isoformat() for i in range(n_days)]}
+        for v in variables:
+            values = recorded["daily"].get(v, [None])
+            daily[v] = [values[i % len(values)] for i in range(n_days)]
+        out.append(dict(recorded, latitude=float(lat), longitude=float(lon), daily=daily))
+    return 200, "application/json", json.dumps(out if len(out) > 1 else out[0]).encode()
+
+
+def _chat_completion(query, body):
+    recorded = json.loads(_recorded("openrouter_chat.json"))
+    request = json.loads(body or b"{}")
+    if not request.get("stream"):
+        return 200, "application/json", json.dumps(recorded).encode()
+
+    def events():
+        base = {"id": recorded["id"], "object": "chat.completion.chunk", "created": recorded["created"], "model": recorded["model"]}
+        words = recorded["choices"][0]["message"]["content"].split(" ")
+        for i, word in enumerate(words):
+            delta = {"content": word if i == 0 else " " + word}
+            chunk = dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+            yield f"data: {json.dumps(chunk)}\n\n".encode()
+        yield f"data: {json.dumps(dict(base, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]))}\n\n".encode()
+        yield f"data: {json.dumps(dict(base, choices=[], usage=recorded['usage']))}\n\n".encode()
+        yield b"data: [DONE]\n\n"
+    return 200, "text/event-stream", events()
+
+
+def start_stubs(latency, jitter, error_rate, token_ms=0, seed=None):
+    """Start one stub per provider; latency/jitter/error_rate map provider name -> value."""
+    routes = {
+        "open_meteo": {("GET", "/v1/search"): _geocode,
+                       ("GET", "/v1/forecast"): _forecast},
+        "amadeus": {("POST", "/v1/security/oauth2/token"): _json_route("amadeus_token.json"),
+                    ("GET", "/v1/reference-data/locations/hotels/by-city"): _json_route("amadeus_hotels.json"),
+                    ("GET", "/v2/shopping/flight-offers"): _json_route("amadeus_flights.json")},
+        "news": {("GET", "/rss/search"): lambda query, body: (200, "application/rss+xml", _recorded("google_news.xml"))},
+        "llm": {("POST", "/chat/completions"): _chat_completion},
+    }
+    return {name: StubProvider(name, routes[name], latency[name], jitter[name], error_rate[name],
+                               token_ms=token_ms if name == "llm" else 0,
+                               seed=None if seed is None else seed + i).start()
+            for i, name in enumerate(PROVIDERS)}
+
+
+def point_pipeline_at(stubs, workdir):
+    """Route every provider URL in pipeline.py to the stubs; must run before pipeline is imported."""
+    os.environ.update({
+        "OPENROUTER_BASE_URL": stubs["llm"].url + "/api/v1",
+        "OPENROUTER_API_KEY": "bench",
+        "AMADEUS_BASE_URL": stubs["amadeus"].url,
+        "PACKPLAY_GEOCODE_URL": stubs["open_meteo"].url + "/v1/search",
+        "PACKPLAY_FORECAST_URL": stubs["open_meteo"].url + "/v1/forecast",
+        "PACKPLAY_NEWS_URL": stubs["news"].url + "/rss/search",
+        "PACKPLAY_GEOCODE_DB": os.path.join(workdir, "geocode_cache.sqlite3"),
+    })
+
+# ========== DRIVER ==========
+
+def load_messages(path=MESSAGES_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def run_benchmark(messages, rounds=1, concurrency=1, cold=False, stream=False, warm=False):
+    """Drive each message through parse -> fetch_all_apis -> generate_travel_response; returns a report dict.
+
+    Startup is measured apart from the run: importing the pipeline, the optional warm-up (warm=True waits
+    for warmup.py to finish first), and the first request, which is timed alone and left out of the stages.
+    """
+    t0 = time.perf_counter()
+    import pipeline
+    import warmup
+    from trip_parser import extract_trip_details
+    startup = {"import_s": time.perf_counter() - t0, "warmup_s": None}
+    if warm:
+        t0 = time.perf_counter()
+        warmup.start()
+        warmup.wait()
+        startup["warmup_s"] = time.perf_counter() - t0
+        startup["warmup_errors"] = warmup.status()["errors"]
+
+    timings = {stage: [] for stage in STAGES}
+    ttft, failures = [], []
+    lock = threading.Lock()
+
+    def one(message, record=True):
+        t0 = time.perf_counter()
+        try:
+            trip = extract_trip_details(message, pipeline.get_nlp())
+            t1 = time.perf_counter()
+            if trip["destination"]:
+                pipeline.fetch_all_apis(trip, pipeline.detect_vegetarian(message))
+            t2 = time.perf_counter()
+            result = pipeline.generate_travel_response(message, stream=stream)
+            if stream and result["reply"] is not None:
+                for _ in result["reply"]:
+                    pass
+            t3 = time.perf_counter()
+        except Exception as e:
+            with lock:
+                failures.append(f"{message!r}: {e}")
+            return
+        if not record:
+            return t3 - t0
+        with lock:
+            for stage, seconds in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t3 - t0)):
+                timings[stage].append(seconds * 1000)
+            if result["stats"].get("ttft_s") is not None:
+                ttft.append(result["stats"]["ttft_s"] * 1000)
+
+    first = one(messages[0], record=False) if messages else None
+    startup["first_request_ms"] = first * 1000 if first is not None else None
+
+    wall = 0.0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(rounds):
+            if cold:
+                pipeline.clear_caches()
+            start = time.perf_counter()
+            list(pool.map(one, messages))
+            wall += time.perf_counter() - start
+
+    if stream:
+        timings["llm_ttft"] = ttft
+    stages = {}
+    for stage, values in timings.items():
+        values.sort()
+        stages[stage] = {"n": len(values), "p50": percentile(values, 50), "p95": percentile(values, 95),
+                         "p99": percentile(values, 99), "mean": sum(values) / len(values) if values else None}
+    completed = len(timings["end_to_end"])
+    return {"startup": startup, "stages": stages, "messages": completed, "failures": failures, "wall_s": wall,
+            "throughput_msg_s": completed / wall if wall else None, "concurrency": concurrency,
+            "rounds": rounds, "cold": cold, "stream": stream,
+            "response_cache": pipeline.get_response_cache().stats()}
+
+
+def print_report(report, stubs):
+    fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9}"
+    startup = report["startup"]
+    print(f"Startup: import {startup['import_s'] * 1000:.0f} ms, warm-up "
+          + (f"{startup['warmup_s'] * 1000:.0f} ms" if startup["warmup_s"] is not None else "skipped")
+          + f", first request {fmt(startup['first_request_ms']).strip()} ms\n")
+    print(f"{'stage':<16}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<16}{s['n']:>6} {fmt(s['p50'])} {fmt(s['p95'])} {fmt(s['p99'])} {fmt(s['mean'])}")
+    print(f"\nThroughput: {report['throughput_msg_s'] or 0:.2f} msg/s "
+          f"({report['messages']} messages, {report['concurrency']} workers, {report['wall_s']:.2f} s)")
+    print("Stub requests: " + ", ".join(f"{s.name} {s.requests} ({s.errors} injected errors)" for s in stubs.values()))
+    print(f"Itinerary cache: {report['response_cache']['hit_rate']:.0%} hit rate")
+    for failure in report["failures"][:10]:
+        print("FAILED", failure)
+
+# ========== CLI ==========
+
+def _per_provider(values, default, cast):
+    """Parse ["120", "llm=800"] into {provider: value}: bare values set every provider, name=value one."""
+    out = dict.fromkeys(PROVIDERS, default)
+    for item in values or []:
+        name, sep, value = item.rpartition("=")
+        if sep and name not in PROVIDERS:
+            raise SystemExit(f"unknown provider {name!r}; expected one of {', '.join(PROVIDERS)}")
+        for p in ([name] if sep else PROVIDERS):
+            out[p] = cast(value)
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline Pack & Play benchmark against local provider stubs")
+    ap.add_argument("--messages", default=MESSAGES_PATH, help="trip messages, one per line")
+    ap.add_argument("--rounds", type=int, default=1, help="passes over the message corpus")
+    ap.add_argument("--concurrency", type=int, default=1, help="messages processed in parallel")
+    ap.add_argument("--latency", action="append", metavar="[PROVIDER=]MS", help="injected latency (default 50)")
+    ap.add_argument("--jitter", action="append", metavar="[PROVIDER=]MS", help="+/- uniform jitter (default 0)")
+    ap.add_argument("--error-rate", action="append", metavar="[PROVIDER=]P", help="share of 503 answers (default 0)")
+    ap.add_argument("--token-ms", type=float, default=5, help="delay between streamed LLM chunks")
+    ap.add_argument("--stream", action="store_true", help="stream LLM replies (also reports time to first token)")
+    ap.add_argument("--cold", action="store_true", help="clear provider and itinerary caches before every round")
+    ap.add_argument("--warmup", action="store_true", help="run the background warm-up and wait for it before the first request")
+    ap.add_argument("--seed", type=int, default=None, help="seed for latency jitter and error injection")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    ap.add_argument("--metrics-file", help="also write the per-stage histograms (Prometheus text) here")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="packplay-bench-") as workdir:
+        stubs = start_stubs(_per_provider(args.latency, 50.0, float), _per_provider(args.jitter, 0.0, float),
+                            _per_provider(args.error_rate, 0.0, float), args.token_ms, args.seed)
+        try:
+            point_pipeline_at(stubs, workdir)
+            report = run_benchmark(load_messages(args.messages), args.rounds, args.concurrency, args.cold, args.stream,
+                                   args.warmup)
+            if args.metrics_file:
+                import tracing
+                tracing.write_metrics(args.metrics_file)
+        finally:
+            for stub in stubs.values():
+                stub.stop()
+    if args.json:
+        report["stubs"] = {s.name: {"requests": s.requests, "errors": s.errors} for s in stubs.values()}
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, stubs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# caching.py - In-process caches shared by every Pack & Play session
+# Module-level registries, so one instance lives per server process whether it runs Streamlit or service.py.
+
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import tracing
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry TTL and hit/miss counters."""
+
+    def __init__(self, maxsize=256, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = self.error = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key: one caller runs, the others wait for its result."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+_flights = SingleFlight()
+
+
+def _call_key(name, args, kwargs):
+    key = (name, args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        key = repr(key)
+    return key
+
+
+def single_flight(fn):
+    """Decorator: at most one in-flight call per (function, arguments); concurrent callers share its result.
+
+    Put it under st.cache_data / swr_cache so simultaneous cache misses for the same key reach upstream once.
+    """
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return _flights.do(_call_key(name, args, kwargs), fn, *args, **kwargs)
+    return wrapper
+
+
+_registry_lock = threading.Lock()
+_ttl_caches = {}
+
+
+def ttl_cache(ttl, maxsize=256):
+    """Decorator memoising results per (function, arguments) for `ttl` seconds; a headless st.cache_data."""
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        with _registry_lock:
+            cache = _ttl_caches.setdefault(name, TTLCache(maxsize=maxsize, ttl=ttl))
+        missing = object()
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _call_key(name, args, kwargs)
+            value = cache.get(key, missing)
+            tracing.annotate(cache="miss" if value is missing else "hit")
+            if value is missing:
+                value = fn(*args, **kwargs)
+                cache.set(key, value)
+            return value
+
+        wrapper.cache = cache
+        wrapper.clear = cache.clear
+        return wrapper
+    return decorator
+
+
+class Stamped(namedtuple("Stamped", "value fetched_at")):
+    """A cached value plus the wall-clock time it was fetched."""
+    __slots__ = ()
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at
+
+
+def describe_age(fetched_at):
+    minutes = int((time.time() - fetched_at) // 60)
+    if minutes < 1:
+        return "just now"
+    if minutes < 90:
+        return f"{minutes} min ago"
+    return f"{minutes // 60} h ago"
+
+
+_refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="swr-refresh")
+_swr_stores = {}
+
+
+def _swr_store(name):
+    # Keyed by function name, not held in the decorator closure: Streamlit re-executes the app
+    # script (and so re-applies the decorator) on every rerun, but this module is imported once.
+    with _registry_lock:
+        return _swr_stores.setdefault(name, (OrderedDict(), set(), threading.Lock()))
+
+
+def swr_cache(soft_ttl, hard_ttl, max_entries=512):
+    """Stale-while-revalidate cache decorator; the wrapped function returns Stamped(value, fetched_at).
+
+    Younger than soft_ttl: served from cache. Between soft_ttl and hard_ttl: served from cache
+    immediately while one background refresh runs. Older than hard_ttl, or missing: fetched inline.
+    A refresh that comes back empty (providers return [] / None on errors) keeps the previous value.
+    """
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        entries, refreshing, lock = _swr_store(name)  # key -> Stamped, keys being refreshed, guard
+
+        def store(key, value):
+            with lock:
+                old = entries.get(key)
+                if not value and old is not None and old.value:
+                    return old
+                entries[key] = stamped = Stamped(value, time.time())
+                entries.move_to_end(key)
+                while len(entries) > max_entries:
+                    entries.popitem(last=False)
+                return stamped
+
+        def refresh(key, args, kwargs):
+            try:
+                store(key, fn(*args, **kwargs))
+            except Exception:
+                pass  # keep serving the stale value; the next caller retries
+            finally:
+                with lock:
+                    refreshing.discard(key)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = _call_key(name, args, kwargs)
+            with lock:
+                hit = entries.get(key)
+                if hit is not None:
+                    entries.move_to_end(key)
+            if hit is not None:
+                if hit.age < soft_ttl:
+                    tracing.annotate(cache="hit")
+                    return hit
+                if hit.age < hard_ttl:
+                    tracing.annotate(cache="stale")
+                    with lock:
+                        start = key not in refreshing
+                        refreshing.add(key)
+                    if start:
+                        _refresher.submit(refresh, key, args, kwargs)
+                    return hit
+            tracing.annotate(cache="miss")
+            return store(key, fn(*args, **kwargs))
+
+        def clear():
+            with lock:
+                entries.clear()
+
+        wrapper.clear = clear
+        return wrapper
+    return decorator
+
+
+def _day(value):
+    return value.date().isoformat() if hasattr(value, "date") else value
+
+
+def itinerary_key(trip, messages, model, vegetarian=False):
+    """Cache key for a generated itinerary: the canonical trip plus a hash of every message sent to the LLM.
+
+    The hash covers the user's own words and the packed API context, so two requests only share an
+    itinerary when the model would have been asked exactly the same thing. The readable prefix reduces
+    dates to the day because relative phrases ("this weekend") parse with the current time.
+    """
+    canonical = "|".join(str(part) for part in (
+        (trip.get("source") or "").strip().casefold(),
+        (trip.get("destination") or "").strip().casefold(),
+        _day(trip.get("start_date")), _day(trip.get("return_date")),
+        trip.get("duration_days"), bool(vegetarian), model,
+    ))
+    prompt = json.dumps(messages, ensure_ascii=False, sort_keys=True, default=str)
+    return canonical + "|" + hashlib.sha256(prompt.encode("utf-8")).hexdigest()
@@ -0,0 +1,128 @@
+# dates.py - Fast date recognition for the trip parser
+# The formats people actually type ("31st Oct", "Nov 9", "9/11", "next Friday", "this weekend")
+# are matched by one precompiled pattern in a single pass and resolved against a reference day.
+# dateparser's search_dates, restricted to English, only runs when none of them match, and results
+# are memoized on (normalized text, reference day) so repeated messages skip both.
+
+import functools
+import re
+from datetime import date, datetime, time, timedelta
+import tracing
+
+MEMO_SIZE = 2048
+NUMERIC_ORDER = "MD"  # how "9/11" is read, like dateparser's English default; the other order is tried if invalid
+
+_MONTHS = {"jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+           "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12}
+_WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+_MONTH = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+_DAY = r"\d{1,2}(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s+\d{4})?"
+_PATTERN = re.compile("|".join([
+    rf"(?P<iso>\d{{4}}-\d{{2}}-\d{{2}})",
+    rf"(?P<day_month>{_DAY}\s+(?:of\s+)?{_MONTH}\.?{_YEAR})",
+    rf"(?P<month_day>{_MONTH}\.?\s+{_DAY}{_YEAR})",
+    r"(?P<numeric>\d{1,2}/\d{1,2}(?:/\d{2}(?:\d{2})?)?|\d{1,2}(?P<sep>[.-])\d{1,2}(?P=sep)\d{2}(?:\d{2})?)",
+    rf"(?P<relative>(?:next|this|coming)\s+(?:{'|'.join(_WEEKDAYS)}|weekend|week))",
+    r"(?P<word>day after tomorrow|tomorrow|today|tonight)",
+]).join([r"\b(?:", r")\b"]))
+_NUMBERS = re.compile(r"\d+")
+
+
+def normalize(text):
+    """Lowercased, single-spaced form of `text`; the memo key and what the patterns run on."""
+    return " ".join(text.lower().split())
+
+
+def _on_or_after(ref, weekday):
+    return ref + timedelta(days=(weekday - ref.weekday()) % 7)
+
+
+def _calendar_date(year, month, day, ref, prefer_future):
+    if year is None:
+        year = ref.year
+        if prefer_future and (month, day) < (ref.month, ref.day):
+            year += 1
+    elif year < 100:
+        year += 2000
+    return date(year, month, day)
+
+
+def _resolve(kind, text, ref, prefer_future):
+    """The date for one fast-path match; raises ValueError for impossible dates such as 31/02."""
+    if kind == "iso":
+        return date.fromisoformat(text)
+    if kind in ("day_month", "month_day"):
+        month = _MONTHS[re.search(_MONTH, text).group()[:3]]
+        numbers = [int(n) for n in _NUMBERS.findall(text)]
+        return _calendar_date(numbers[1] if len(numbers) > 1 else None, month, numbers[0], ref, prefer_future)
+    if kind == "numeric":
+        numbers = [int(n) for n in _NUMBERS.findall(text)]
+        year = numbers[2] if len(numbers) > 2 else None
+        month, day = numbers[:2] if NUMERIC_ORDER == "MD" else numbers[1::-1]
+        try:
+            return _calendar_date(year, month, day, ref, prefer_future)
+        except ValueError:
+            return _calendar_date(year, day, month, ref, prefer_future)
+    if kind == "word":
+        return ref + timedelta(days={"today": 0, "tonight": 0, "tomorrow": 1}.get(text, 2))
+    which, unit = text.split()
+    if unit == "week":
+        return ref + timedelta(days=0 if which == "this" else 7)
+    if unit == "weekend":  # its Saturday; "this weekend" on a Sunday is today
+        day = ref if ref.weekday() == 6 else _on_or_after(ref, 5)
+        return day + timedelta(days=7 if which == "next" else 0)
+    # "this/coming Friday" may be today, "next Friday" is the first one after today
+    return _on_or_after(ref + timedelta(days=1 if which == "next" else 0), _WEEKDAYS.index(unit))
+
+
+def _fast_path(text, ref, prefer_future):
+    found = []
+    for m in _PATTERN.finditer(text):
+        kind = m.lastgroup
+        try:
+            found.append((m.group(kind), datetime.combine(_resolve(kind, m.group(kind), ref, prefer_future), time())))
+        except ValueError:
+            continue
+    return found
+
+
+def _search_dates(text, ref, prefer_future):
+    from dateparser.search import search_dates  # deferred: heavy import, see warmup.py
+    settings = {"RELATIVE_BASE": datetime.combine(ref, time())}
+    if prefer_future:
+        settings["PREFER_DATES_FROM"] = "future"
+    try:
+        matches = search_dates(text, languages=["en"], settings=settings) or []
+    except Exception:
+        return []
+    found = [(text.find(mtext.lower()), mtext, dt) for mtext, dt in matches]
+    return [(mtext, dt) for pos, mtext, dt in sorted(f for f in found if f[0] != -1)]
+
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def _find(key, ref, prefer_future):
+    found = _fast_path(key, ref, prefer_future)
+    if found:
+        return "fast", tuple(found)
+    return "dateparser", tuple(_search_dates(key, ref, prefer_future))
+
+
+def find_dates(text, reference=None, prefer_future=True):
+    """(matched text, datetime) pairs in order of appearance, resolved against `reference` (default today)."""
+    ref = reference.date() if isinstance(reference, datetime) else reference or date.today()
+    hits = _find.cache_info().hits
+    path, found = _find(normalize(text or ""), ref, prefer_future)
+    tracing.annotate(path=path, memo=_find.cache_info().hits > hits)
+    return list(found)
+
+
+def date_spans(text):
+    """(start, end) of each date expression the fast path recognizes in `text`, which should already be normalize()d."""
+    for m in _PATTERN.finditer(text):
+        yield m.span()
+
+
+def clear_memo():
+    _find.cache_clear()
@@ -0,0 +1,150 @@
+# flight_offers.py - Lean Amadeus flight-offer search
+# The search asks the API for only what it needs (max offers, nonStop, currencyCode), the response
+# is streamed and decoded one offer at a time instead of .json() on the whole body (the
+# "dictionaries" block after the offers is never parsed), and each offer is reduced to a compact
+# FlightOffer. Offers are then ranked on price and duration together with numpy. A price calendar
+# is a list of FareDay, the cheapest fare per departure day.
+
+import codecs
+import json
+import re
+from collections import namedtuple
+from urllib.parse import urlencode
+
+MAX_OFFERS = 10        # offers requested from, and kept per search
+CHUNK_SIZE = 16 * 1024
+DURATION_WEIGHT = 0.5  # how much a relatively longer journey counts against a relatively cheaper fare
+
+_DURATION = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?")
+
+FareDay = namedtuple("FareDay", "date price currency")  # price is None when nothing was found that day
+
+
+class FlightOffer:
+    """One offer: total price, segment count, journey minutes and the validating carrier."""
+    __slots__ = ("price", "currency", "segments", "duration", "carrier")
+
+    def __init__(self, price, currency, segments, duration, carrier):
+        self.price, self.currency, self.segments, self.duration, self.carrier = price, currency, segments, duration, carrier
+
+    @property
+    def stops(self):
+        return self.segments - 1
+
+    def describe(self):
+        stops = "nonstop" if not self.stops else f"{self.stops} stop{'s' if self.stops > 1 else ''}"
+        hours, minutes = divmod(self.duration, 60)
+        return f"{self.price:.2f} {self.currency} · {self.carrier} · {stops} · {hours}h {minutes:02d}m"
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"FlightOffer({self.describe()})"
+
+
+def search_url(base_url, origin, dest, day, currency, non_stop=False, max_offers=MAX_OFFERS):
+    params = {"originLocationCode": origin, "destinationLocationCode": dest, "departureDate": day,
+              "adults": 1, "nonStop": "true" if non_stop else "false", "currencyCode": currency, "max": max_offers}
+    return f"{base_url}/v2/shopping/flight-offers?{urlencode(params)}"
+
+
+def minutes(iso_duration):
+    """An ISO 8601 duration such as "PT5H40M" in minutes; 0 when missing or malformed."""
+    m = _DURATION.fullmatch(iso_duration or "")
+    return int(m.group(1) or 0) * 60 + int(m.group(2) or 0) if m else 0
+
+
+def iter_array(chunks, key="data"):
+    """Yield the elements of the top-level `key` array of a JSON object streamed as text chunks, one at a time."""
+    decoder = json.JSONDecoder()
+    marker = re.compile(rf'"{key}"\s*:\s*\[')
+    buf, started = "", False
+    for chunk in chunks:
+        buf += chunk
+        if not started:
+            m = marker.search(buf)
+            if not m:
+                buf = buf[-len(key) - 16:]  # keep enough to match a marker split across chunks
+                continue
+            buf, started = buf[m.end():], True
+        while True:
+            i = len(buf) - len(buf.lstrip(" \t\r\n,"))
+            if i == len(buf):
+                buf = ""
+                break
+            if buf[i] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buf, i)
+            except ValueError:  # element not complete yet
+                buf = buf[i:]
+                break
+            yield item
+            buf = buf[end:]
+    if started:
+        raise ValueError("truncated flight-offers response")
+
+
+def iter_text(response, chunk_size=CHUNK_SIZE):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in response.iter_content(chunk_size):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def parse_offer(item):
+    itinerary = item["itineraries"][0]
+    segments = itinerary["segments"]
+    price = item["price"]
+    carrier = (item.get("validatingAirlineCodes") or [segments[0].get("carrierCode", "?")])[0]
+    return FlightOffer(float(price.get("grandTotal") or price["total"]), price.get("currency", ""),
+                       len(segments), minutes(itinerary.get("duration")), carrier)
+
+
+def read_offers(response, max_offers=MAX_OFFERS):
+    """Compact offers from a streamed flight-offers response, decoding no further than needed.
+
+    The rest of the body is still read (and discarded), so closing the response returns its
+    connection to the keep-alive pool instead of dropping it.
+    """
+    chunks = iter_text(response)
+    offers = []
+    for item in iter_array(chunks):
+        try:
+            offers.append(parse_offer(item))
+        except (KeyError, IndexError, TypeError, ValueError):
+            continue
+        if len(offers) >= max_offers:
+            break
+    for _ in chunks:
+        pass
+    return offers
+
+
+def rank(offers):
+    """Best first, by price and duration each relative to the best on offer."""
+    if len(offers) < 2:
+        return list(offers)
+    import numpy as np  # deferred: heavy import, see warmup.py
+    prices = np.fromiter((o.price for o in offers), dtype=np.float64, count=len(offers))
+    durations = np.fromiter((o.duration for o in offers), dtype=np.float64, count=len(offers))
+    durations[durations <= 0] = durations.max() or 1  # unknown duration: assume the longest
+    score = prices / max(prices.min(), 0.01) + DURATION_WEIGHT * durations / durations.min()
+    return [offers[i] for i in np.argsort(score, kind="stable")]
+
+
+def cheapest_day(calendar):
+    priced = [d for d in calendar if d.price is not None]
+    return min(priced, key=lambda d: d.price) if priced else None
+
+
+def summarize_calendar(source, destination, calendar):
+    """One prompt line with the cheapest fare per day; None when no day has a fare."""
+    best = cheapest_day(calendar)
+    if best is None:
+        return None
+    days = "; ".join(f"{d.date:%a %d %b} {d.price:.0f}" if d.price is not None else f"{d.date:%a %d %b} none"
+                     for d in calendar)
+    return (f"Cheapest fares from {source} to {destination} by departure day ({best.currency}): {days}. "
+            f"Cheapest: {best.date:%a %d %b}.")
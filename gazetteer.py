@@ -0,0 +1,55 @@
+# gazetteer.py - Fast place-name extraction for the trip parser
+# A PhraseMatcher over the bundled data/places.txt list, run on the tokenizer output only,
+# so common messages ("Chennai to Kodaikanal on 31st Oct") skip the NER pipeline entirely.
+
+import os
+import threading
+
+PLACES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "places.txt")
+
+
+def load_places(path=PLACES_FILE):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+class Gazetteer:
+    """Matches known place names in text, case-insensitively, using only the tokenizer of `nlp`."""
+
+    def __init__(self, nlp, places=None):
+        self.nlp = nlp
+        from spacy.matcher import PhraseMatcher  # spacy is already loaded by the time nlp exists
+        self.matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
+        # make_doc only tokenizes, so building the patterns is cheap even for large lists
+        self.matcher.add("PLACE", [nlp.make_doc(p) for p in (places or load_places())])
+
+    def find(self, text):
+        """Return matched place names in order of appearance, longest match first at a position, de-duplicated."""
+        doc = self.nlp.make_doc(text)
+        spans = sorted(((s, e) for _, s, e in self.matcher(doc)), key=lambda m: (m[0], -m[1]))
+        places, seen, last_end = [], set(), 0
+        for start, end in spans:
+            if start < last_end:  # overlaps a longer match ("New Delhi" vs "Delhi")
+                continue
+            last_end = end
+            name = doc[start:end].text
+            if name.lower() not in seen:
+                seen.add(name.lower())
+                places.append(name)
+        return places
+
+
+_gazetteers = {}
+_lock = threading.Lock()
+
+
+def get_gazetteer(nlp):
+    """One compiled Gazetteer per loaded spaCy pipeline, shared across threads and sessions."""
+    key = id(nlp.vocab)
+    gz = _gazetteers.get(key)
+    if gz is None:
+        with _lock:
+            gz = _gazetteers.get(key)
+            if gz is None:
+                gz = _gazetteers[key] = Gazetteer(nlp)
+    return gz
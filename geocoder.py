@@ -0,0 +1,85 @@
+# geocoder.py - Persistent city -> coordinates resolver for Pack & Play
+# Coordinates never change, so Open-Meteo geocoding results are kept in a local SQLite file
+# shared by every worker process and surviving restarts. Names that don't resolve are
+# remembered too (negative cache) so we don't keep asking the geocoder about them.
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import http_transport
+
+GEOCODE_URL = "https://geocoding-api.open-meteo.com/v1/search"
+DEFAULT_DB = os.environ.get("PACKPLAY_GEOCODE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocode_cache.sqlite3"))
+NEGATIVE_TTL = 7 * 24 * 3600  # unknown names are retried after a week
+MEMORY_SIZE = 10000           # in-process entries before the memory layer is reset
+
+
+def _normalize(name):
+    return re.sub(r"\s+", " ", name).strip().casefold()
+
+
+class GeocodeResolver:
+    """Resolve a place name to the first Open-Meteo geocoding result, cached in memory and on disk."""
+
+    def __init__(self, path=DEFAULT_DB, negative_ttl=NEGATIVE_TTL, geocode_url=GEOCODE_URL):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.geocode_url = geocode_url
+        self._memory = {}
+        self._local = threading.local()  # sqlite3 connections are per-thread
+        self._conn().execute(
+            "CREATE TABLE IF NOT EXISTS geocode (name TEXT PRIMARY KEY, result TEXT, fetched_at REAL NOT NULL)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # readers in other processes don't block the writer
+            self._local.conn = conn
+        return conn
+
+    def _load(self, key):
+        row = self._conn().execute("SELECT result, fetched_at FROM geocode WHERE name = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+        result, fetched_at = row
+        if result is None and time.time() - fetched_at > self.negative_ttl:
+            return False, None
+        return True, json.loads(result) if result else None
+
+    def _store(self, key, result):
+        self._conn().execute("INSERT OR REPLACE INTO geocode (name, result, fetched_at) VALUES (?, ?, ?)",
+                             (key, json.dumps(result) if result else None, time.time()))
+
+    def _fetch(self, name):
+        params = {"name": name, "count": 1, "language": "en", "format": "json"}
+        res = http_transport.get(self.geocode_url, params=params)
+        res.raise_for_status()  # a final 429 / 5xx after retries is an outage, not an unknown name
+        body = res.json()
+        if body.get("error"):
+            raise RuntimeError(f"geocoding error: {body.get('reason')}")
+        results = body.get("results")
+        return results[0] if results else None
+
+    def resolve(self, name):
+        """Return the geocoding result dict (latitude, longitude, ...) or None if the name is unknown.
+
+        Network errors are raised and never cached, so a transient outage doesn't poison the store.
+        """
+        if not name:
+            return None
+        key = _normalize(name)
+        if key in self._memory:
+            return self._memory[key]
+        hit, result = self._load(key)
+        if not hit:
+            result = self._fetch(name)
+            self._store(key, result)
+        if result is not None:
+            if len(self._memory) >= MEMORY_SIZE:
+                self._memory.clear()
+            self._memory[key] = result  # negatives stay on disk only, so they can expire
+        return result
@@ -0,0 +1,64 @@
+# http_transport.py - Shared HTTP transport for every Pack & Play provider
+# One keep-alive requests.Session per process: pooled connections per host, bounded
+# jittered retries on idempotent requests, and the same connect/read timeouts everywhere.
+
+import random
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Worst case for one GET must stay well under the providers' PROVIDER_TIMEOUT (15 s): a provider
+# abandoned by the fan-out keeps its pool thread until the request gives up. A read timeout is not
+# retried (the upstream is slow, asking again only doubles the wait), so the worst case is a connect
+# timeout, one backoff and a full second attempt: 3.05 + 0.3 + 3.05 + 5 = ~11.4 s. Retry-After is
+# ignored for the same reason; a rate-limited provider is retried once after the usual backoff.
+TIMEOUT = (3.05, 5)   # (connect, read) seconds
+POOL_HOSTS = 10       # host pools kept alive (Open-Meteo x2, Amadeus, Google News, ...)
+POOL_SIZE = 16        # keep-alive connections per host; >= provider thread pool size
+MAX_RETRIES = 1
+BACKOFF = 0.3         # seconds; retry n sleeps up to BACKOFF * 2**(n-1)
+
+
+class _JitteredRetry(Retry):
+    """urllib3 Retry with full jitter, so concurrent sessions don't retry in lockstep."""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff else 0
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    retry = _JitteredRetry(
+        total=MAX_RETRIES, connect=MAX_RETRIES, read=0, status=MAX_RETRIES,
+        backoff_factor=BACKOFF, status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),  # never replay a POST (OAuth, bookings)
+        respect_retry_after_header=False, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["User-Agent"] = "PackAndPlay/1.0"
+    return session
+
+
+def session():
+    """Return the process-wide session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def get(url, timeout=TIMEOUT, **kwargs):
+    return session().get(url, timeout=timeout, **kwargs)
+
+
+def post(url, timeout=TIMEOUT, **kwargs):
+    return session().post(url, timeout=timeout, **kwargs)
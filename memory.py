@@ -0,0 +1,88 @@
+# memory.py - Bounded conversation memory for the Pack & Play chat
+# The last few turns are kept verbatim within a token budget; older turns are folded one at a
+# time into a rolling summary that has its own token cap. Both go into the prompt, so prompt
+# size and per-session memory stay flat however long the conversation runs. The memory is part of
+# the messages caching.itinerary_key hashes, so cached itineraries are never replayed mid-conversation.
+
+from collections import deque
+from prompt_packer import count_tokens, truncate_tokens
+
+MAX_TURNS = 4           # verbatim (user, assistant) pairs
+HISTORY_TOKENS = 800    # budget for the verbatim turns together
+REPLY_TOKENS = 250      # an assistant reply is stored cut to this; itineraries are long
+SUMMARY_TOKENS = 250    # cap on the rolling summary
+SUMMARY_USER_TOKENS = 40
+SUMMARY_REPLY_TOKENS = 30
+
+
+def extractive_fold(summary, user, assistant):
+    """Default summarizer: append a short line for the folded turn, no LLM call."""
+    first_line = assistant.strip().split("\n", 1)[0]
+    line = f"- User: {truncate_tokens(user, SUMMARY_USER_TOKENS)} / Planner: {truncate_tokens(first_line, SUMMARY_REPLY_TOKENS)}"
+    return f"{summary}\n{line}" if summary else line
+
+
+def llm_fold(client, model):
+    """Summarizer that asks the LLM to merge the folded turn into the running summary."""
+    def fold(summary, user, assistant):
+        prompt = (f"Running summary of a travel-planning chat:\n{summary or '(empty)'}\n\n"
+                  f"New exchange to merge in:\nUser: {user}\nPlanner: {truncate_tokens(assistant, REPLY_TOKENS)}\n\n"
+                  f"Rewrite the summary in at most {SUMMARY_TOKENS * 3 // 4} words, keeping destinations, dates, "
+                  "budgets and preferences.")
+        response = client.chat.completions.create(model=model, messages=[{"role": "user", "content": prompt}],
+                                                  max_tokens=SUMMARY_TOKENS, temperature=0.2)
+        return response.choices[0].message.content or summary
+    return fold
+
+
+class ConversationMemory:
+    """Last turns verbatim plus a rolling summary of everything older."""
+
+    def __init__(self, max_turns=MAX_TURNS, history_tokens=HISTORY_TOKENS, summary_tokens=SUMMARY_TOKENS, fold=None):
+        self.max_turns = max_turns
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.fold = fold or extractive_fold
+        self.turns = deque()  # [user, assistant, tokens]
+        self.summary = ""
+        self.folded = 0       # turns summarized so far
+
+    def _history_size(self):
+        return sum(t[2] for t in self.turns)
+
+    def add_turn(self, user, assistant):
+        """Record one exchange, folding the oldest turns into the summary while over the limits."""
+        user, assistant = truncate_tokens(user, REPLY_TOKENS), truncate_tokens(assistant or "", REPLY_TOKENS)
+        self.turns.append([user, assistant, count_tokens(user) + count_tokens(assistant)])
+        while len(self.turns) > self.max_turns or (len(self.turns) > 1 and self._history_size() > self.history_tokens):
+            old_user, old_assistant, _ = self.turns.popleft()
+            try:
+                summary = self.fold(self.summary, old_user, old_assistant)
+            except Exception:
+                summary = extractive_fold(self.summary, old_user, old_assistant)
+            self.summary = self._cap_summary(summary)
+            self.folded += 1
+
+    def _cap_summary(self, summary):
+        # The oldest lines go first: recent context matters more to the next reply
+        while count_tokens(summary) > self.summary_tokens and "\n" in summary:
+            summary = summary.split("\n", 1)[1]
+        return truncate_tokens(summary, self.summary_tokens)
+
+    def messages(self):
+        """Chat messages to place between the system prompt and the new user prompt."""
+        out = []
+        if self.summary:
+            out.append({"role": "system", "content": f"Earlier in this conversation ({self.folded} turns, summarized):\n{self.summary}"})
+        for user, assistant, _ in self.turns:
+            out.append({"role": "user", "content": user})
+            out.append({"role": "assistant", "content": assistant})
+        return out
+
+    def tokens(self):
+        return sum(count_tokens(m["content"]) for m in self.messages())
+
+    def clear(self):
+        self.turns.clear()
+        self.summary = ""
+        self.folded = 0
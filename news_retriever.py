@@ -0,0 +1,60 @@
+# news_retriever.py - BM25 retrieval over fetched news articles (the "R" in our RAG)
+# The index is built once per fetched feed; a query is scored against every article with
+# a single matrix-vector product, so a few hundred articles per destination is still cheap.
+
+import re
+
+_TAG = re.compile(r"<[^>]+>")
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset("""
+a about after all also am an and any are as at be been before being but by can could did do does doing
+for from get go going had has have having he her here him his how i if in into is it its just me more
+most my no not now of off on once only or other our out over own please same she should so some such
+than that the their them then there these they this those through to too trip under until up very
+want was we were what when where which while who why will with would you your
+nbsp href https http www com news google
+""".split())
+
+
+def tokenize(text):
+    """Lowercase word tokens with HTML tags and stop words removed."""
+    return [t for t in _TOKEN.findall(_TAG.sub(" ", text or "").lower()) if t not in STOP_WORDS and len(t) > 1]
+
+
+class BM25Index:
+    """Okapi BM25 over article title + summary, precomputed into a dense docs x vocab weight matrix."""
+
+    def __init__(self, articles, k1=1.5, b=0.75):
+        import numpy as np  # deferred: heavy import, see warmup.py
+        self.articles = list(articles)
+        docs = [tokenize(f"{a.get('title', '')} {a.get('summary', '')}") for a in self.articles]
+        self.vocab = {t: i for i, t in enumerate(sorted({t for d in docs for t in d}))}
+
+        tf = np.zeros((len(docs), len(self.vocab)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for t in doc:
+                tf[row, self.vocab[t]] += 1
+        n_docs = max(len(docs), 1)
+        doc_len = tf.sum(axis=1, keepdims=True)
+        avg_len = float(doc_len.mean()) if len(docs) else 0.0
+        df = (tf > 0).sum(axis=0)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = k1 * (1 - b + b * doc_len / avg_len) if avg_len else k1
+        self.weights = idf * tf * (k1 + 1) / (tf + norm)
+
+    def __len__(self):
+        return len(self.articles)
+
+    def search(self, query, top_k=3):
+        """Return up to top_k articles that score above 0 for `query`, best first; ties keep feed order."""
+        if not self.articles:
+            return []
+        import numpy as np
+        q = np.zeros(len(self.vocab), dtype=np.float32)
+        for t in tokenize(query):
+            idx = self.vocab.get(t)
+            if idx is not None:
+                q[idx] = 1.0
+        scores = self.weights @ q
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [self.articles[i] for i in order if scores[i] > 0]
@@ -0,0 +1,569 @@
+# pipeline.py - The Pack & Play trip pipeline, free of Streamlit
+# Parsing, provider aggregation and itinerary generation, shared by the chat UI (app_v3.py)
+# and the headless HTTP service (service.py). Nothing here calls st.*, so it runs the same
+# under Streamlit, under an ASGI server, or from a script.
+
+import contextvars
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date as Date, timedelta, datetime
+from functools import partial
+import requests
+import http_transport
+from airports import get_city_resolver
+from amadeus_auth import AmadeusTokenProvider
+import tracing
+import dates
+from caching import Stamped, TTLCache, itinerary_key, single_flight, swr_cache, ttl_cache
+import flight_offers
+from geocoder import GeocodeResolver
+from news_retriever import BM25Index
+from prompt_packer import ContextPacker, count_tokens, truncate_tokens
+from trip_parser import extract_trip_details
+import weather
+
+log = logging.getLogger("packplay")
+
+# ========== CONFIGURATION ==========
+
+LLM_API_KEY = os.environ.get("OPENROUTER_API_KEY", "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")
+LLM_BASE_URL = os.environ.get("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+LLM_MODEL = os.environ.get("PACKPLAY_MODEL", "deepseek/deepseek-chat-v3-0324")
+AMADEUS_CLIENT_ID = os.environ.get("AMADEUS_CLIENT_ID", "0v0IryggYObLYMgSXOktLUxK8sxk5RUo")
+AMADEUS_CLIENT_SECRET = os.environ.get("AMADEUS_CLIENT_SECRET", "ijLaSc2UVJq86G5T")
+
+# Provider endpoints; overridable so the benchmark (benchmark.py) can point them at local stubs
+AMADEUS_URL = os.environ.get("AMADEUS_BASE_URL", "https://test.api.amadeus.com")
+GEOCODE_URL = os.environ.get("PACKPLAY_GEOCODE_URL", "https://geocoding-api.open-meteo.com/v1/search")
+FORECAST_URL = os.environ.get("PACKPLAY_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+NEWS_URL = os.environ.get("PACKPLAY_NEWS_URL", "https://news.google.com/rss/search")
+
+# Cache policy: past the soft TTL a cached value is served while it refreshes in the background;
+# only past the hard max age (or on a cold miss) does a request wait for the provider.
+WEATHER_TTL, WEATHER_MAX_AGE = 1800, 6 * 3600
+NEWS_TTL, NEWS_MAX_AGE = 1800, 6 * 3600
+HOTELS_TTL, HOTELS_MAX_AGE = 3600, 24 * 3600
+FLIGHTS_TTL = 3600
+FLIGHT_CURRENCY = os.environ.get("PACKPLAY_CURRENCY", "INR")
+CALENDAR_DAYS = 3         # price-calendar mode searches start_date ± this many days
+CALENDAR_CONCURRENCY = 4  # per-day fare searches in flight at once, per process
+CALENDAR_OFFERS = 3       # offers read per day; the API returns them cheapest first
+
+PROVIDER_TIMEOUT = 15  # seconds; a provider slower than this is dropped from the context
+NEWS_POOL = 100        # feed entries indexed per destination; only the top matches reach the prompt
+
+RESPONSE_CACHE_TTL = 6 * 3600
+RESPONSE_CACHE_SIZE = 256
+
+SYSTEM_PROMPT = "You are a friendly travel planner."
+PROMPT_BUDGET = 3000    # tokens for system + user prompt
+USER_PLAN_TOKENS = 400  # cap on the raw user message inside the prompt
+SECTION_TOKENS = {"weather": 160, "weather_source": 40, "flights": 200, "fares": 120, "hotels": 250, "news": 150}  # per-section caps
+FLIGHTS_IN_PROMPT = 2   # best-ranked offers described to the LLM
+MAX_TOKENS = 700
+
+# ========== SHARED RESOURCES ==========
+
+def _once(fn):
+    """Create the resource on first use and share it process-wide (the headless st.cache_resource)."""
+    lock = threading.Lock()
+    box = []
+
+    @functools.wraps(fn)
+    def wrapper():
+        if not box:
+            with lock:
+                if not box:
+                    box.append(fn())
+        return box[0]
+    return wrapper
+
+@_once
+def get_llm():
+    from openai import OpenAI  # heavy imports are deferred to first use, see warmup.py
+    client = OpenAI(api_key=LLM_API_KEY, base_url=LLM_BASE_URL)
+    return client, LLM_MODEL
+
+@_once
+def get_nlp():
+    import spacy
+    try:
+        return spacy.load("en_core_web_trf")
+    except:
+        return spacy.load("en_core_web_sm")
+
+@_once
+def get_amadeus():
+    """One cached Amadeus OAuth token per process, shared by every session."""
+    return AmadeusTokenProvider(AMADEUS_CLIENT_ID, AMADEUS_CLIENT_SECRET, auth_url=f"{AMADEUS_URL}/v1/security/oauth2/token")
+
+@_once
+def get_geocoder():
+    """City coordinates from a persistent SQLite cache shared across processes and restarts."""
+    return GeocodeResolver(geocode_url=GEOCODE_URL)
+
+@_once
+def get_executor():
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="provider")
+
+@_once
+def get_calendar_executor():
+    """Separate from get_executor(): the calendar itself runs as a provider task, and this caps Amadeus load."""
+    return ThreadPoolExecutor(max_workers=CALENDAR_CONCURRENCY, thread_name_prefix="fares")
+
+@_once
+def get_response_cache():
+    """Generated itineraries keyed by canonical trip + API context."""
+    return TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+# ========== TRIP PARSER ==========
+
+def detect_vegetarian(text):
+    return bool(re.search(r"\bveg|vegetarian\b", (text or "").lower()))
+
+# A hedge only makes the dates flexible when it is attached to a date: "around Nov 9", "Nov 9 or so",
+# but not "things to do around Ooty" or "two days or so"
+_HEDGE_BEFORE = re.compile(r"\b(?:around|approx\w*|roughly)\s+(?:(?:on|the)\s+)?$")
+_HEDGE_AFTER = re.compile(r",?\s*(?:give or take|or so|plus or minus|±)")
+
+def detect_flexible_dates(text):
+    """True for "flexible dates", "around Nov 9", "Nov 9 give or take" and the like."""
+    text = dates.normalize(text or "")
+    if re.search(r"\bflexible\b", text):
+        return True
+    return any(_HEDGE_BEFORE.search(text, 0, start) or _HEDGE_AFTER.match(text, end)
+               for start, end in dates.date_spans(text))
+
+def parse_trip(user_input, nlp=None, last_trip=None):
+    """extract_trip_details, with fields the message doesn't mention carried over from `last_trip`."""
+    with tracing.span("parse"):
+        trip = extract_trip_details(user_input, nlp or get_nlp())
+    if last_trip:
+        for k in trip:
+            if not trip[k] and last_trip.get(k):
+                trip[k] = last_trip[k]
+    return trip
+
+# ========== WEATHER API ==========
+
+@swr_cache(soft_ttl=WEATHER_TTL, hard_ttl=WEATHER_MAX_AGE)
+@single_flight
+def get_weather(cities, first_day, last_day):
+    """Daily forecasts over the trip window for several cities in one request; [(city, [Day])] or None."""
+    located = []
+    for city in cities:
+        try:
+            result = get_geocoder().resolve(city)  # persistent, so usually no network
+        except:
+            result = None
+        if result:
+            located.append((city, (result["latitude"], result["longitude"])))
+    if not located:
+        return None
+    try:
+        forecasts = weather.fetch_daily([c for _, c in located], first_day, last_day, FORECAST_URL)
+    except Exception:
+        return None
+    return [(city, days) for (city, _), days in zip(located, forecasts)]
+
+# ========== HOTELS API (VEG FILTER) ==========
+
+HOTELS_POOL = 50  # by-city hotels kept per city; every limit / veg filter is applied to this one list
+VEG_WORDS = ("veg", "vegetarian", "saravana", "woodlands", "bhavan")
+
+def get_hotels_by_city(city, vegetarian=False, limit=3):
+    """Stamped list of up to `limit` hotels; every call for a city shares one cached by-city request."""
+    pool = _city_hotels(city)
+    hotels = [h for h in pool.value or [] if not vegetarian or any(w in h["name"].lower() for w in VEG_WORDS)]
+    return Stamped(hotels[:limit], pool.fetched_at)
+
+@swr_cache(soft_ttl=HOTELS_TTL, hard_ttl=HOTELS_MAX_AGE)
+@single_flight
+def _city_hotels(city):
+    try:
+        iata = get_city_resolver().iata(city)
+        if not iata: return []  # no airport / unknown city: don't spend a round trip on an empty answer
+        amadeus = get_amadeus()
+
+        loc_url = f"{AMADEUS_URL}/v1/reference-data/locations/hotels/by-city?cityCode={iata}"
+        loc_res = amadeus.get(loc_url)
+        if loc_res is None:
+            return []
+        loc_res = loc_res.json()
+        hotels = loc_res.get("data", [])
+        if not hotels:
+            return []
+
+        results = []
+        for h in hotels[:HOTELS_POOL]:
+            name = h.get("name", "Unknown")
+            address = ", ".join(filter(None, h.get("address", {}).get("lines", []) +
+                                       [h.get("address", {}).get("cityName", "")]))
+            results.append({"id": h.get("hotelId"), "name": name, "price": "N/A", "address": address})
+        return results
+    except Exception as e:
+        log.warning("Hotel API error: %s", e)
+        return []
+
+# ========== FLIGHTS API ==========
+
+@ttl_cache(ttl=FLIGHTS_TTL)
+@single_flight
+def get_flights_by_route(source, destination, date=None, non_stop=False):
+    """Up to flight_offers.MAX_OFFERS compact FlightOffers, best (price and duration) first."""
+    try:
+        resolver = get_city_resolver()
+        origin, dest = resolver.iata(source), resolver.iata(destination)
+        if not (origin and dest) or origin == dest: return []
+        date_str = (date or datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+        return flight_offers.rank(_search_offers(origin, dest, date_str, non_stop))
+    except Exception as e:
+        log.warning("Flight API error: %s", e)
+        return []
+
+def _search_offers(origin, dest, day, non_stop=False, max_offers=flight_offers.MAX_OFFERS):
+    """Compact offers for one IATA route and ISO day; raises on HTTP or auth errors."""
+    url = flight_offers.search_url(AMADEUS_URL, origin, dest, day, FLIGHT_CURRENCY, non_stop, max_offers)
+    res = get_amadeus().get(url, stream=True)  # decoded offer by offer, see flight_offers.read_offers
+    if res is None:
+        raise RuntimeError("no Amadeus token")
+    with res:
+        if res.status_code != 200:
+            raise RuntimeError(f"HTTP {res.status_code} {res.text[:200]}")
+        return flight_offers.read_offers(res, max_offers)
+
+@ttl_cache(ttl=FLIGHTS_TTL, maxsize=4096)
+@single_flight
+def get_cheapest_fare(origin, dest, day):
+    """Cheapest FlightOffer for one IATA route on one ISO day, or None when nothing flies.
+
+    Keyed on airports and day only, so overlapping calendars (other users, other city spellings)
+    share each day's search. Errors raise, so they are not cached.
+    """
+    return min(_search_offers(origin, dest, day, max_offers=CALENDAR_OFFERS), key=lambda o: o.price, default=None)
+
+def get_price_calendar(source, destination, around=None, days=CALENDAR_DAYS):
+    """[FareDay] for each day in around ± days (not before today), searched concurrently; [] without a route."""
+    resolver = get_city_resolver()
+    origin, dest = resolver.iata(source), resolver.iata(destination)
+    if not (origin and dest) or origin == dest:
+        return []
+    today = Date.today()
+    center = (around.date() if isinstance(around, datetime) else around) or today + timedelta(days=1)
+    first, last = max(center - timedelta(days=days), today), center + timedelta(days=days)
+    window = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+    futures = [get_calendar_executor().submit(contextvars.copy_context().run, _traced, "fares.day",
+                                              partial(get_cheapest_fare, origin, dest, d.isoformat()))
+               for d in window]
+    calendar = []
+    for d, future in zip(window, futures):
+        try:
+            offer = future.result(timeout=PROVIDER_TIMEOUT)
+        except Exception as e:
+            log.warning("Fare search %s-%s %s failed: %s", origin, dest, d, e)
+            offer = None
+        calendar.append(flight_offers.FareDay(d, offer.price if offer else None,
+                                              offer.currency if offer else FLIGHT_CURRENCY))
+    return calendar
+
+# ========== NEWS API ==========
+
+@swr_cache(soft_ttl=NEWS_TTL, hard_ttl=NEWS_MAX_AGE)
+@single_flight
+def fetch_news(destination, max_articles=5):
+    import feedparser
+    rss_url = f"{NEWS_URL}?q={destination}+travel+tourism&hl=en-IN&gl=IN&ceid=IN:en&when=7d"
+    try:
+        feed = feedparser.parse(http_transport.get(rss_url).content)
+    except requests.RequestException:
+        return []
+    return [{'title': e.title, 'summary': e.get('summary', '')[:300] + '...', 'link': e.link} for e in feed.entries[:max_articles]]
+
+_news_indexes = TTLCache(maxsize=256, ttl=NEWS_MAX_AGE)
+
+def get_news_index(destination):
+    """BM25 index over the destination's feed, rebuilt only when the feed itself is refetched."""
+    news = fetch_news(destination, max_articles=NEWS_POOL)
+    key = (destination, news.fetched_at)
+    index = _news_indexes.get(key)
+    if index is None:
+        index = BM25Index(news.value)
+        _news_indexes.set(key, index)
+    return news._replace(value=index)
+
+def relevant_news(trip, news_index, user_input=""):
+    """Articles of a Stamped news index that match the trip and `user_input`, best first."""
+    if not news_index:
+        return []
+    parts = [trip.get('destination'), trip.get('source'), user_input]
+    return news_index.value.search(" ".join(p for p in parts if p))
+
+def clear_caches():
+    """Drop every in-process provider and itinerary cache (the persistent geocode cache is kept)."""
+    for fn in (get_weather, _city_hotels, get_flights_by_route, get_cheapest_fare, fetch_news):
+        fn.clear()
+    _news_indexes.clear()
+    get_response_cache().clear()
+
+# ========== AGGREGATOR ==========
+
+def _traced(name, call):
+    with tracing.span(f"provider.{name}"):  # the cache decorators annotate hit / stale / miss
+        return call()
+
+def _fan_out(calls, concurrent=True, timeout=PROVIDER_TIMEOUT):
+    """Run {name: callable} provider calls and return {name: result}; failed or timed-out calls map to None."""
+    if not concurrent:
+        results = {}
+        for name, call in calls.items():
+            try:
+                results[name] = _traced(name, call)
+            except Exception:
+                results[name] = None
+        return results
+
+    # Each worker runs in a copy of our context so its spans land on the caller's trace
+    futures = {name: get_executor().submit(contextvars.copy_context().run, _traced, name, call)
+               for name, call in calls.items()}
+    wait(futures.values(), timeout=timeout)
+    return {name: f.result() if f.done() and not f.exception() else None for name, f in futures.items()}
+
+# Trip fields each provider depends on; a follow-up turn only refetches providers whose fields changed
+PROVIDER_FIELDS = {
+    "weather": ("destination", "source", "start_date", "return_date", "duration_days"),
+    "hotels": ("destination", "vegetarian"),
+    "flights": ("destination", "source", "start_date"),
+    "fares": ("destination", "source", "start_date"),
+    "news": ("destination",),
+}
+
+def trip_state(trip, vegetarian, results):
+    """What fetch_all_apis needs from this turn to update the next one incrementally."""
+    return {"trip": dict(trip), "vegetarian": vegetarian, "results": results}
+
+def changed_fields(previous, trip, vegetarian):
+    """Names of the trip fields (plus "vegetarian") that differ from the previous turn's trip_state."""
+    changed = {k for k in trip if trip[k] != previous["trip"].get(k)}
+    if vegetarian != previous["vegetarian"]:
+        changed.add("vegetarian")
+    return changed
+
+def affected_providers(changed):
+    return {name for name, fields in PROVIDER_FIELDS.items() if changed.intersection(fields)}
+
+# Previous-turn results are reused only while younger than the provider's soft TTL, so a long-lived
+# session never outlives the cache policy above. Flights and fares carry no timestamp: they always go
+# through their ttl_cache, which is a dict lookup while the entry is fresh.
+REUSE_TTL = {"weather": WEATHER_TTL, "hotels": HOTELS_TTL, "news": NEWS_TTL}
+
+def _reusable(name, value):
+    """Stamped, non-empty (providers answer [] / None on errors) and within REUSE_TTL."""
+    return (name in REUSE_TTL and isinstance(value, Stamped) and bool(value.value)
+            and value.age < REUSE_TTL[name])
+
+def fetch_all_apis(trip, vegetarian=False, concurrent=True, previous=None, flexible=False, user_input="",
+                   get_hotels=None):
+    """Fetch all providers; returns (ContextPacker, raw provider results by name).
+
+    With the previous turn's trip_state, providers unaffected by what changed reuse its still-fresh
+    results instead of being called again. Without a start date, or with `flexible` dates, a price calendar
+    around the start date ("fares") is fetched alongside the flights. News is ranked against the trip and
+    `user_input`, so a reused index still answers this turn's request. `get_hotels` replaces
+    get_hotels_by_city as the hotels provider (same signature), e.g. to price the hotels.
+    """
+    dest, src, start_date = trip['destination'], trip['source'], trip['start_date']
+    context = ContextPacker()
+    window = weather.trip_window(start_date, trip['return_date'], trip['duration_days'])
+
+    calls = {
+        "hotels": partial(get_hotels or get_hotels_by_city, dest, vegetarian=vegetarian),
+        "flights": partial(get_flights_by_route, src, dest, start_date),
+        "news": partial(get_news_index, dest),
+    }
+    if window:  # destination and source share one forecast request, dates as ISO strings for the cache key
+        cities = tuple(dict.fromkeys(c for c in (dest, src) if c))
+        calls["weather"] = partial(get_weather, cities, *(d.isoformat() for d in window))
+    if src and (flexible or not start_date):
+        calls["fares"] = partial(get_price_calendar, src, dest, start_date)
+    reused = {}
+    if previous:
+        affected = affected_providers(changed_fields(previous, trip, vegetarian))
+        reused = {name: previous["results"][name] for name in calls
+                  if name not in affected and _reusable(name, previous["results"].get(name))}
+        calls = {name: call for name, call in calls.items() if name not in reused}
+    with tracing.span("fetch_all_apis") as sp:
+        if reused:
+            sp.set(reused=",".join(sorted(reused)))
+        results = {**reused, **_fan_out(calls, concurrent)}
+
+    # Weather: every trip day at the destination, the departure day at the source
+    w = results.get("weather")
+    if not window:
+        context.add("weather", f"Weather in {dest}: no forecast yet, the trip starts more than "
+                               f"{weather.FORECAST_DAYS} days from now.", priority=1)
+    elif w and w.value:
+        for city, days in w.value:
+            if city == dest:
+                context.add("weather", weather.summarize(city, days), priority=1, max_tokens=SECTION_TOKENS["weather"])
+            elif days:
+                context.add("weather_source", weather.summarize(city, days[:1]), priority=4,
+                            max_tokens=SECTION_TOKENS["weather_source"])
+
+    # Hotels
+    hotels = results["hotels"].value if results["hotels"] else None
+    if hotels:
+        hotel_str = " | ".join([f"{h['name']} ({h['price']})" for h in hotels])
+        context.add("hotels", f"Hotels in {dest}: {hotel_str}", priority=3, max_tokens=SECTION_TOKENS["hotels"])
+
+    # Flights
+    flights = results["flights"]
+    if flights:
+        flight_str = " | ".join(f.describe() for f in flights[:FLIGHTS_IN_PROMPT])
+        context.add("flights", f"Flights from {src} to {dest}: {flight_str}", priority=2, max_tokens=SECTION_TOKENS["flights"])
+    fares = flight_offers.summarize_calendar(src, dest, results.get("fares") or [])
+    if fares:
+        context.add("fares", fares, priority=2, max_tokens=SECTION_TOKENS["fares"])
+
+    # News: the feed articles most relevant to this trip and request
+    for rank, n in enumerate(relevant_news(trip, results.get("news"), user_input)):  # best match first, so it is the last news item to be dropped
+        context.add(f"news[{rank}]", f"News: {n['title']} - {n['summary']} (Source: {n['link']})", priority=4 + rank,
+                    max_tokens=SECTION_TOKENS["news"])
+
+    return context, results
+
+# ========== LLM RESPONSE ==========
+
+def build_messages(user_input, trip, context, memory=None):
+    """Chat messages with the API context packed into the token budget; returns (messages, api_context, prompt_tokens).
+
+    With a ConversationMemory, its summary and recent turns sit between the system prompt and the
+    new request, and their (bounded) size comes out of the context budget. The itinerary cache key
+    hashes these messages, so a follow-up on the same trip ("make it more relaxed") is never answered
+    with the previous itinerary.
+    """
+    with tracing.span("prompt") as sp:
+        messages, api_context, prompt_tokens = _build_messages(user_input, trip, context, memory)
+        sp.set(tokens=prompt_tokens)
+    return messages, api_context, prompt_tokens
+
+def _build_messages(user_input, trip, context, memory=None):
+    prompt_template = (f"You are a travel assistant. User wants: {truncate_tokens(user_input, USER_PLAN_TOKENS)}. "
+                       f"Trip details: {trip}. Context: {{api_context}}. Make a personalized response.")
+    history = memory.messages() if memory else []
+    history_tokens = sum(count_tokens(m["content"]) for m in history)
+    reserved = count_tokens(SYSTEM_PROMPT) + count_tokens(prompt_template) + history_tokens
+    api_context = context.pack(PROMPT_BUDGET - reserved) or "No data available."
+    prompt = prompt_template.replace("{api_context}", api_context)
+    messages = [{"role": "system", "content": SYSTEM_PROMPT}, *history,
+                {"role": "user", "content": prompt}]
+    return messages, api_context, count_tokens(SYSTEM_PROMPT + "\n" + prompt) + history_tokens
+
+def complete(client, model, messages, max_tokens=MAX_TOKENS, temperature=0.7):
+    with tracing.span("llm", stream=False):
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+    return response.choices[0].message.content
+
+def iter_completion(client, model, messages, stats=None, max_tokens=MAX_TOKENS, temperature=0.7):
+    """Yield reply text deltas as they stream in; once exhausted, `stats` holds TTFT and tokens/sec."""
+    # The trace is looked up now: the generator body may run later, from another thread
+    return _iter_completion(client, model, messages, {} if stats is None else stats,
+                            max_tokens, temperature, tracing.current_trace())
+
+def _iter_completion(client, model, messages, stats, max_tokens, temperature, trace):
+    with tracing.span("llm", trace=trace, stream=True) as sp:
+        t0 = time.perf_counter()
+        first = None
+        n_chunks, usage = 0, None
+        stream = client.chat.completions.create(model=model, messages=messages, max_tokens=max_tokens,
+                                                temperature=temperature, stream=True,
+                                                stream_options={"include_usage": True})
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            if first is None:
+                first = time.perf_counter()
+                tracing.observe("llm.first_token", first - t0)
+            n_chunks += 1
+            yield delta
+        end = time.perf_counter()
+
+        tokens = usage.completion_tokens if usage else n_chunks  # chunk count approximates tokens when usage isn't sent
+        gen_time = end - first if first else 0
+        stats.update({"model": model, "ttft_s": first - t0 if first else None, "total_s": end - t0,
+                      "completion_tokens": tokens, "tokens_per_s": tokens / gen_time if gen_time > 0 else None})
+        sp.set(tokens=tokens, ttft_ms=round(stats["ttft_s"] * 1000) if first else None)
+
+def generate_travel_response(user_input, last_trip=None, stream=False, nlp=None, client=None, model=None, memory=None,
+                             previous=None, get_hotels=None):
+    """Run the whole pipeline for one message.
+
+    Returns a dict with trip, vegetarian, prompt_tokens, cached and reply (None when no destination is
+    found). With stream=True, reply is an iterator of text deltas and `stats` is filled once it is exhausted;
+    the finished text is cached either way, and recorded in `memory` (a ConversationMemory) when given.
+    `previous` is the last turn's trip_state: unaffected providers are reused and the vegetarian flag
+    carries over. The dict also holds the provider `results`, this turn's trip `state` and the context
+    packer's `report` (sections dropped or shortened to fit the budget). `get_hotels` is passed to fetch_all_apis.
+    """
+    if client is None:
+        client, model = get_llm()
+    trip = parse_trip(user_input, nlp, last_trip)
+    vegetarian = detect_vegetarian(user_input) or bool(previous and previous["vegetarian"])
+    result = {"trip": trip, "vegetarian": vegetarian, "reply": None, "cached": False, "prompt_tokens": None, "stats": {},
+              "results": {}, "state": None, "report": None}
+    if not trip['destination']:
+        return result
+
+    context, result["results"] = fetch_all_apis(trip, vegetarian, previous=previous,
+                                                flexible=detect_flexible_dates(user_input), user_input=user_input,
+                                                get_hotels=get_hotels)
+    result["state"] = trip_state(trip, vegetarian, result["results"])
+    messages, _, result["prompt_tokens"] = build_messages(user_input, trip, context, memory)
+    result["report"] = context.report
+
+    cache = get_response_cache()
+    cache_key = itinerary_key(trip, messages, model, vegetarian)
+    with tracing.span("itinerary_cache") as sp:
+        cached = cache.get(cache_key)
+        sp.set(cache="miss" if cached is None else "hit")
+    if cached is not None:
+        if memory is not None:
+            memory.add_turn(user_input, cached)
+        result.update(cached=True, reply=iter([cached]) if stream else cached)
+        return result
+
+    if not stream:
+        text = complete(client, model, messages)
+        if text:
+            cache.set(cache_key, text)
+            if memory is not None:
+                memory.add_turn(user_input, text)
+        result["reply"] = text
+        return result
+
+    def deltas():
+        parts = []
+        for delta in iter_completion(client, model, messages, result["stats"]):
+            parts.append(delta)
+            yield delta
+        if parts:
+            cache.set(cache_key, "".join(parts))
+            if memory is not None:
+                memory.add_turn(user_input, "".join(parts))
+
+    result["reply"] = deltas()
+    return result
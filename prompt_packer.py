@@ -0,0 +1,74 @@
+# prompt_packer.py - Token-budget-aware packing of API context into the LLM prompt
+# Each context section (weather, flights, hotels, news items, ...) has a priority and its own
+# token cap; when the prompt would exceed the model budget, the least important sections are
+# shortened or dropped first instead of chopping the prompt by characters.
+
+import functools
+
+ENCODING = "cl100k_base"
+ELLIPSIS = "…"
+MIN_SHORTENED = 24  # a section cut below this many tokens is dropped instead
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(name=ENCODING):
+    """tiktoken encoder, loaded once per process."""
+    import tiktoken  # deferred: heavy import, see warmup.py
+    return tiktoken.get_encoding(name)
+
+
+def count_tokens(text):
+    return len(get_encoding().encode(text or ""))
+
+
+def truncate_tokens(text, max_tokens):
+    """Cut `text` to at most `max_tokens` tokens (ellipsis included)."""
+    enc = get_encoding()
+    ids = enc.encode(text or "")
+    if len(ids) <= max_tokens:
+        return text
+    if max_tokens <= 1:
+        return ""
+    return enc.decode(ids[:max_tokens - 1]).rstrip() + ELLIPSIS
+
+
+class ContextPacker:
+    """Collects prioritised context sections and packs them into a token budget.
+
+    Lower `priority` means more important. Sections are emitted in the order they were added,
+    whatever was dropped or shortened along the way.
+    """
+
+    def __init__(self, sep="\n"):
+        self.sep = sep
+        self.sections = []  # [name, text, priority]
+        self.report = {}
+
+    def add(self, name, text, priority, max_tokens=None):
+        if text:
+            if max_tokens is not None:
+                text = truncate_tokens(text, max_tokens)
+            self.sections.append([name, text, priority])
+        return self
+
+    def pack(self, budget):
+        """Return the joined context fitting in `budget` tokens; details end up in self.report."""
+        sep_tokens = count_tokens(self.sep)
+        kept, dropped, shortened = {}, [], []
+        remaining = budget
+        for idx in sorted(range(len(self.sections)), key=lambda i: self.sections[i][2]):
+            name, text, _ = self.sections[idx]
+            cost = count_tokens(text) + sep_tokens
+            if cost <= remaining:
+                kept[idx] = text
+                remaining -= cost
+            elif remaining - sep_tokens >= MIN_SHORTENED:
+                kept[idx] = truncate_tokens(text, remaining - sep_tokens)
+                shortened.append(name)
+                remaining = 0
+            else:
+                dropped.append(name)
+        context = self.sep.join(kept[i] for i in sorted(kept))
+        self.report = {"budget": budget, "context_tokens": count_tokens(context),
+                       "dropped": dropped, "shortened": shortened}
+        return context
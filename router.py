@@ -0,0 +1,78 @@
+# router.py - Intent routing in front of the itinerary generator
+# Follow-ups such as the quick-reply buttons ("Show more hotel options", "Find cheaper flights",
+# "Latest weather forecast") are lookups against the current trip: they are answered from the one
+# relevant provider with a template, with no parsing, fan-out or LLM call. Anything that looks like
+# planning (new places, dates, durations, or several topics at once) goes to the LLM as before.
+
+import re
+import tracing
+import weather
+from pipeline import get_flights_by_route, get_hotels_by_city, get_weather
+
+PLAN = "plan"
+MAX_WORDS = 12    # longer messages are treated as planning requests
+MORE_HOTELS = 8   # hotels listed for "show more hotel options"
+
+_TOPICS = {
+    "hotels": re.compile(r"\b(hotels?|stays?|accommodations?|rooms?|lodging|resorts?)\b", re.I),
+    "flights": re.compile(r"\b(flights?|fares?|airfares?|air tickets?|planes?)\b", re.I),
+    "weather": re.compile(r"\b(weather|forecast|temperatures?|rain|sunny)\b", re.I),
+}
+# New places, dates, durations or numbers mean the trip itself is changing
+_PLACE_CUE = re.compile(r"\b(?:from|to|in|visit)\s+[A-Z]")
+_PLANNING = re.compile(r"\d|\b(plan|itinerary|trip|days?|nights?|weeks?|weekend|tomorrow|today|budget|instead|change)\b",
+                       re.I)
+
+
+def classify(text, trip=None):
+    """Return "hotels", "flights" or "weather" for a lookup about the current `trip`, otherwise PLAN."""
+    text = (text or "").strip()
+    if not trip or not trip.get("destination") or not text or len(text.split()) > MAX_WORDS:
+        return PLAN
+    if _PLACE_CUE.search(text) or _PLANNING.search(text):
+        return PLAN
+    topics = [name for name, pattern in _TOPICS.items() if pattern.search(text)]
+    return topics[0] if len(topics) == 1 else PLAN
+
+
+def _hotels(trip, vegetarian):
+    dest = trip["destination"]
+    hotels = get_hotels_by_city(dest, vegetarian=vegetarian, limit=MORE_HOTELS).value  # same cached list as the plan
+    if not hotels:
+        return f"I couldn't find {'vegetarian-friendly ' if vegetarian else ''}hotels in {dest} right now."
+    lines = [f"- **{h['name']}**" + (f" — {h['address']}" if h.get("address") else "") for h in hotels]
+    return f"🏨 Hotels in {dest}{' (vegetarian-friendly)' if vegetarian else ''}:\n" + "\n".join(lines)
+
+
+def _flights(trip, vegetarian):
+    src, dest, day = trip["source"], trip["destination"], trip["start_date"]
+    if not src:
+        return None  # the LLM can ask where they're flying from
+    flights = sorted(get_flights_by_route(src, dest, day) or [], key=lambda f: f.price)
+    when = f" on {weather.day_label(day)}" if day else ""
+    if not flights:
+        return f"I couldn't find flight offers from {src} to {dest}{when} right now."
+    lines = [f"- {f.describe()}" for f in flights]
+    return f"✈️ Flights from {src} to {dest}{when}, cheapest first:\n" + "\n".join(lines)
+
+
+def _weather(trip, vegetarian):
+    dest, src = trip["destination"], trip["source"]
+    window = weather.trip_window(trip["start_date"], trip["return_date"], trip["duration_days"])
+    if not window:
+        return f"The trip starts more than {weather.FORECAST_DAYS} days from now, so there's no forecast for {dest} yet."
+    cities = tuple(dict.fromkeys(c for c in (dest, src) if c))  # same key as fetch_all_apis, so usually cached
+    forecast = get_weather(cities, *(d.isoformat() for d in window))
+    days = dict(forecast.value).get(dest) if forecast and forecast.value else None
+    if not days:
+        return f"I couldn't get the forecast for {dest} right now."
+    return "☀️ " + weather.summarize(dest, days)
+
+
+_ANSWERS = {"hotels": _hotels, "flights": _flights, "weather": _weather}
+
+
+def answer(intent, trip, vegetarian=False):
+    """Template reply for a lookup intent from its single provider; None to fall back to the LLM."""
+    with tracing.span("route", intent=intent):
+        return _ANSWERS[intent](trip, vegetarian)
@@ -0,0 +1,171 @@
+# service.py - Headless Pack & Play HTTP API over the pipeline in pipeline.py
+# Run with several worker processes, e.g.:
+#   uvicorn service:app --host 0.0.0.0 --port 8000 --workers 4
+#
+#   POST /parse      {"message": "...", "last_trip": {...}}        -> {"trip": {...}}
+#   POST /context    {"trip": {...}, "vegetarian": false, "message": "..."}  -> {"context": "...", "providers": {...}}
+#   POST /itinerary  {"message": "...", "last_trip": {...}, "stream": false}
+#                    -> {"trip", "reply", "cached", "prompt_tokens", "stats"}; with "stream": true the body is
+#                       NDJSON: {"trip": ...}, then {"delta": "..."} per chunk, then {"done": true, "stats": ...}
+#   GET  /ready      200 once the background warm-up (warmup.py) has finished, 503 before; body has the timings
+#   GET  /metrics    per-stage latency histograms (Prometheus text format) of this worker process
+# Parsing, provider calls and the LLM are blocking, so they run in the threadpool; the event loop only routes.
+
+import time
+_T0 = time.perf_counter()  # startup time = importing everything below (the heavy libraries load lazily)
+
+import json
+from datetime import date, datetime
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+import pipeline
+import tracing
+import warmup
+from caching import Stamped
+from flight_offers import FlightOffer
+from news_retriever import BM25Index
+from trip_parser import _empty_trip
+
+STARTUP_S = time.perf_counter() - _T0
+tracing.observe("startup.import", STARTUP_S)
+
+
+def _jsonable(value):
+    if isinstance(value, Stamped):
+        return {"value": _jsonable(value.value), "fetched_at": value.fetched_at}
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, FlightOffer):
+        return value.as_dict()
+    if isinstance(value, BM25Index):
+        return _jsonable(value.articles)
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+def _trip_from_json(trip):
+    """Inverse of _jsonable for a trip dict: ISO date strings back to datetimes, missing fields as None.
+
+    Raises ValueError for anything that isn't a usable trip, which the routes turn into a 400.
+    """
+    if not trip:
+        return None
+    if not isinstance(trip, dict):
+        raise ValueError("trip must be an object")
+    trip = dict(_empty_trip(), **{k: v for k, v in trip.items() if k in _empty_trip()})
+    for k in ("start_date", "return_date"):
+        if trip[k] is not None:
+            if not isinstance(trip[k], str):
+                raise ValueError(f"'{k}' must be an ISO date string")
+            try:
+                trip[k] = datetime.fromisoformat(trip[k])
+            except ValueError:
+                raise ValueError(f"'{k}' is not an ISO date: {trip[k]!r}") from None
+    if trip["duration_days"] is not None and (not isinstance(trip["duration_days"], int)
+                                              or isinstance(trip["duration_days"], bool)):
+        raise ValueError("'duration_days' must be an integer")
+    return trip
+
+
+async def _body(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    return body if isinstance(body, dict) else None
+
+
+def _bad_request(msg):
+    return JSONResponse({"error": msg}, status_code=400)
+
+
+async def parse(request: Request):
+    body = await _body(request)
+    if not body or not body.get("message"):
+        return _bad_request("'message' is required")
+    try:
+        last_trip = _trip_from_json(body.get("last_trip"))
+    except ValueError as e:
+        return _bad_request(str(e))
+    trip = await run_in_threadpool(pipeline.parse_trip, body["message"], None, last_trip)
+    return JSONResponse({"trip": _jsonable(trip)})
+
+
+async def context(request: Request):
+    body = await _body(request)
+    if not body or not isinstance(body.get("trip"), dict) or not body["trip"].get("destination"):
+        return _bad_request("'trip' with a destination is required")
+    budget = body.get("budget", pipeline.PROMPT_BUDGET)
+    if not isinstance(budget, int) or isinstance(budget, bool) or budget <= 0:
+        return _bad_request("'budget' must be a positive integer")
+    message = body.get("message") or ""
+    if not isinstance(message, str):
+        return _bad_request("'message' must be a string")
+    try:
+        trip = _trip_from_json(body["trip"])
+    except ValueError as e:
+        return _bad_request(str(e))
+    packer, results = await run_in_threadpool(pipeline.fetch_all_apis, trip, bool(body.get("vegetarian")),
+                                              flexible=bool(body.get("flexible")), user_input=message)
+    return JSONResponse({"context": packer.pack(budget), "report": packer.report, "providers": _jsonable(results)})
+
+
+async def itinerary(request: Request):
+    body = await _body(request)
+    if not body or not body.get("message"):
+        return _bad_request("'message' is required")
+    try:
+        last_trip = _trip_from_json(body.get("last_trip"))
+    except ValueError as e:
+        return _bad_request(str(e))
+    stream = bool(body.get("stream"))
+    t0 = time.perf_counter()
+    result = await run_in_threadpool(pipeline.generate_travel_response, body["message"], last_trip, stream)
+    head = {"trip": _jsonable(result["trip"]), "cached": result["cached"], "prompt_tokens": result["prompt_tokens"]}
+
+    if not stream or result["reply"] is None:
+        warmup.record_request(time.perf_counter() - t0)
+        return JSONResponse(dict(head, reply=result["reply"], stats=result["stats"]))
+
+    async def lines():
+        yield json.dumps(head) + "\n"
+        async for delta in iterate_in_threadpool(result["reply"]):
+            yield json.dumps({"delta": delta}) + "\n"
+        yield json.dumps({"done": True, "stats": result["stats"]}) + "\n"
+        warmup.record_request(time.perf_counter() - t0)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def health(request: Request):
+    return JSONResponse({"status": "ok"})
+
+
+async def ready(request: Request):
+    status = dict(warmup.status(), startup_s=round(STARTUP_S, 3))
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
+async def metrics(request: Request):
+    return PlainTextResponse(tracing.render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+app = Starlette(on_startup=[warmup.start], routes=[
+    Route("/parse", parse, methods=["POST"]),
+    Route("/context", context, methods=["POST"]),
+    Route("/itinerary", itinerary, methods=["POST"]),
+    Route("/health", health),
+    Route("/ready", ready),
+    Route("/metrics", metrics),
+])
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("service:app", host="0.0.0.0", port=8000, workers=4)
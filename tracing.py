@@ -0,0 +1,178 @@
+# tracing.py - In-process stage tracing and Prometheus-style metrics for Pack & Play
+# Every span feeds a per-stage latency histogram (packplay_stage_duration_seconds), exposed in the
+# Prometheus text format through serve_metrics() / write_metrics() or service.py's /metrics route.
+# Inside `with trace() as t:` the spans are also collected on `t`, which is what the app_v3 debug
+# waterfall draws. No external collector: everything lives in this process.
+
+import contextlib
+import contextvars
+import http.server
+import os
+import tempfile
+import threading
+import time
+
+METRIC = "packplay_stage_duration_seconds"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# ========== HISTOGRAMS ==========
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus expects it."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        idx = next((i for i, b in enumerate(self.buckets) if seconds <= b), len(self.buckets))
+        with self._lock:
+            self.counts[idx] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+_histograms = {}  # (stage, cache) -> Histogram
+_histograms_lock = threading.Lock()
+
+
+def observe(stage, seconds, cache=""):
+    key = (stage, cache)
+    hist = _histograms.get(key)
+    if hist is None:
+        with _histograms_lock:
+            hist = _histograms.setdefault(key, Histogram())
+    hist.observe(seconds)
+
+
+def render_metrics():
+    """All stage histograms in the Prometheus text exposition format."""
+    lines = [f"# HELP {METRIC} Latency of each Pack & Play pipeline stage.", f"# TYPE {METRIC} histogram"]
+    with _histograms_lock:
+        items = sorted(_histograms.items())
+    for (stage, cache), hist in items:
+        counts, total, count = hist.snapshot()
+        labels = f'stage="{stage}",cache="{cache}"'
+        running = 0
+        for bound, n in zip(hist.buckets + ("+Inf",), counts):
+            running += n
+            lines.append(f'{METRIC}_bucket{{{labels},le="{bound}"}} {running}')
+        lines.append(f"{METRIC}_sum{{{labels}}} {total:.6f}")
+        lines.append(f"{METRIC}_count{{{labels}}} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path):
+    """Write render_metrics() to `path` atomically (for node_exporter's textfile collector and the like)."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".prom.tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(render_metrics())
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Serve GET /metrics from a daemon thread; returns the server."""
+    server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+# ========== SPANS ==========
+
+class Trace:
+    """Spans recorded for one request, with start offsets relative to the trace start."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.spans = []  # dicts: name, depth, start_ms, duration_ms, attrs
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def waterfall(self):
+        """Spans ordered by start time, for display."""
+        with self._lock:
+            return sorted(self.spans, key=lambda s: s["start_ms"])
+
+
+class Span:
+    __slots__ = ("name", "attrs", "depth", "trace", "start")
+
+    def __init__(self, name, attrs, depth, trace):
+        self.name, self.attrs, self.depth, self.trace = name, attrs, depth, trace
+        self.start = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+_current_trace = contextvars.ContextVar("packplay_trace", default=None)
+_current_span = contextvars.ContextVar("packplay_span", default=None)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextlib.contextmanager
+def trace():
+    """Collect the spans of everything run inside this block (including fan-out workers) on a Trace."""
+    t = Trace()
+    prev = _current_trace.get()
+    _current_trace.set(t)
+    try:
+        yield t
+    finally:
+        _current_trace.set(prev)
+
+
+@contextlib.contextmanager
+def span(name, trace=None, **attrs):
+    """Time a stage: always observed into its histogram, and recorded on the active (or given) trace."""
+    parent = _current_span.get()
+    s = Span(name, attrs, parent.depth + 1 if parent else 0, trace or _current_trace.get())
+    _current_span.set(s)  # set/restore rather than reset(token): generators may resume in another context
+    try:
+        yield s
+    except BaseException:
+        s.attrs.setdefault("error", True)
+        raise
+    finally:
+        _current_span.set(parent)
+        end = time.perf_counter()
+        observe(name, end - s.start, str(s.attrs.get("cache", "")))
+        if s.trace is not None:
+            s.trace.add({"name": name, "depth": s.depth, "start_ms": (s.start - s.trace.t0) * 1000,
+                         "duration_ms": (end - s.start) * 1000, "attrs": dict(s.attrs)})
+
+
+def annotate(**attrs):
+    """Attach attributes (e.g. cache="hit") to the innermost active span, if any."""
+    s = _current_span.get()
+    if s is not None:
+        s.attrs.update(attrs)
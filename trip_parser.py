@@ -0,0 +1,135 @@
+# trip_parser.py - Natural-language trip parser shared by the Pack & Play apps
+# No Streamlit here, so it can also be used for offline / bulk re-parsing of logged messages:
+#   for trip in extract_trip_details_batch(messages, nlp, batch_size=256, n_process=4): ...
+
+import re
+from collections import deque
+from datetime import timedelta
+from dates import find_dates
+from gazetteer import get_gazetteer
+import tracing
+
+PLACE_LABELS = ("GPE", "LOC", "FAC")
+
+# ========== HELPERS ==========
+
+_WORD_NUM = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+             "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+
+def _word_to_int(s):
+    s = s.lower().strip()
+    if s.isdigit(): return int(s)
+    return _WORD_NUM.get(s)
+
+# "for 3 days", "3-day", "five day", "for 4 nights" in one pass. As with the old per-pattern
+# search, a count in digits wins over one in words ("one day in Ooty, then 3 days" -> 3).
+_DURATION = re.compile(r'\b(\d+|' + '|'.join(_WORD_NUM) + r')[-\s]?(?:days?|nights?)\b', re.I)
+
+def _extract_duration_days(text):
+    in_words = None
+    for m in _DURATION.finditer(text):
+        token = m.group(1)
+        val = _word_to_int(token)
+        if val and token.isdigit(): return val
+        in_words = in_words or val
+    return in_words
+
+def _empty_trip():
+    return {"source": None, "destination": None, "start_date": None, "return_date": None, "duration_days": None}
+
+def _ner_places(doc):
+    return [ent.text for ent in doc.ents if ent.label_ in PLACE_LABELS]
+
+def _merge_places(text, *found):
+    """Places from several finders in order of appearance in `text`, de-duplicated, longest match first at a position."""
+    lowered = text.lower()
+    spans = sorted({(lowered.find(p.lower()), p) for places in found for p in places},
+                   key=lambda m: (m[0], -len(m[1])))
+    places, seen, last_end = [], set(), 0
+    for start, name in spans:
+        if start < last_end or name.lower() in seen:  # overlaps a longer match ("New Delhi" vs "Delhi")
+            continue
+        last_end = start + len(name)
+        seen.add(name.lower())
+        places.append(name)
+    return places
+
+# ========== TRIP PARSER ==========
+
+def _trip_from_places(text, gpes, prefer_future_dates=True):
+    """Apply the route regexes, date search and duration logic given the places found in `text`."""
+    if not text:
+        return _empty_trip()
+    src = dst = None
+    text_stripped = text.strip()
+
+    m = re.search(r'\bfrom\s+([A-Z][a-zA-Z\s]{1,60}?)\s+(?:to|->|-)\s+([A-Z][a-zA-Z\s]{1,60}?)\b', text_stripped)
+    if m:
+        src, dst = m.group(1).strip().title(), m.group(2).strip().title()
+    else:
+        m2 = re.search(r'\b([A-Z][a-zA-Z\s]{1,60}?)\s+(?:to|->|-)\s+([A-Z][a-zA-Z\s]{1,60}?)\b', text_stripped)
+        if m2:
+            src, dst = m2.group(1).strip().title(), m2.group(2).strip().title()
+
+    if not src and gpes:
+        src = gpes[0].title()
+    if not dst and len(gpes) > 1:
+        dst = gpes[1].title()
+    elif len(gpes) == 1 and re.search(r'\b(to|visit|going to|trip to)\s+' + re.escape(gpes[0]), text, re.I):
+        dst = gpes[0].title()
+
+    with tracing.span("parse.dates"):
+        found = find_dates(text, prefer_future=prefer_future_dates)  # fast path, dateparser fallback, memoized
+
+    start_date = return_date = None
+    duration = _extract_duration_days(text)
+
+    if len(found) >= 2:
+        start_date, return_date = found[0][1], found[1][1]
+    elif len(found) == 1:
+        start_date = found[0][1]
+        if duration: return_date = start_date + timedelta(days=duration)
+
+    if start_date and return_date and not duration:
+        duration = (return_date - start_date).days
+
+    return {"source": src, "destination": dst, "start_date": start_date, "return_date": return_date, "duration_days": duration}
+
+def extract_trip_details(text, nlp, prefer_future_dates=True):
+    if not text:
+        return _empty_trip()
+    # Fast path: gazetteer match on the tokenizer output; the NER pipeline only runs if it finds < 2 places,
+    # and what it finds is merged with the gazetteer hits
+    with tracing.span("parse.places") as sp:
+        gpes = get_gazetteer(nlp).find(text)
+        sp.set(ner=len(gpes) < 2)
+        if len(gpes) < 2:
+            gpes = _merge_places(text, gpes, _ner_places(nlp(text)))
+    return _trip_from_places(text, gpes, prefer_future_dates)
+
+def extract_trip_details_batch(texts, nlp, batch_size=64, n_process=1, prefer_future_dates=True):
+    """Yield extract_trip_details(text, nlp) for every text, in input order.
+
+    Texts the gazetteer fast path can't settle are streamed through nlp.pipe(batch_size, n_process)
+    instead of one nlp() call each; `texts` can be any iterable, including a generator over a log file.
+    """
+    gazetteer = get_gazetteer(nlp)
+    queue = deque()  # (text, places, done) in input order; not done while waiting for NER
+
+    def ner_inputs():
+        for text in texts:
+            places = gazetteer.find(text) if text else []
+            done = not text or len(places) >= 2
+            queue.append((text, places, done))
+            if not done:
+                yield text
+
+    for doc in nlp.pipe(ner_inputs(), batch_size=batch_size, n_process=n_process):
+        while queue[0][2]:  # fast-path texts that came before this doc
+            text, places, _ = queue.popleft()
+            yield _trip_from_places(text, places, prefer_future_dates)
+        text, places, _ = queue.popleft()
+        yield _trip_from_places(text, _merge_places(text, places, _ner_places(doc)), prefer_future_dates)
+    while queue:
+        text, places, _ = queue.popleft()
+        yield _trip_from_places(text, places, prefer_future_dates)
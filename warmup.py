@@ -0,0 +1,116 @@
+# warmup.py - Background warm-up and readiness for Pack & Play processes
+# The heavy libraries (spacy, dateparser, tiktoken, openai, feedparser, numpy) are imported lazily on
+# first use, so importing the apps is fast. start() then loads the spaCy pipeline, the dateparser
+# language data and the tiktoken encoding on a daemon thread right after startup, so the first user
+# doesn't pay for them; ready() / wait() / status() report when that's done. Set PACKPLAY_WARMUP=0 to
+# skip the warm-up and load everything on first use instead.
+#
+# Timings land in the stage histograms (tracing.py) as warmup.<step>, warmup and request.first.
+
+import importlib
+import os
+import threading
+import time
+import tracing
+
+ENABLED = os.environ.get("PACKPLAY_WARMUP", "1") != "0"
+SAMPLE = "Trip from Trichy to Goa on Nov 9 for 3 days, vegetarian options please"
+LIBRARIES = ("numpy", "feedparser", "openai", "tiktoken", "dateparser", "spacy")
+
+_ready = threading.Event()
+_lock = threading.Lock()
+_thread = None
+_load_nlp = None  # set by start()
+_state = {"started_at": None, "finished_at": None, "steps": {}, "errors": {}, "first_request_s": None}
+
+
+def _default_nlp():
+    import pipeline
+    return pipeline.get_nlp()
+
+
+def _warm_nlp():
+    from gazetteer import get_gazetteer
+    nlp = _load_nlp()
+    nlp(SAMPLE)  # first call initialises the transformer / vectors
+    get_gazetteer(nlp)
+
+
+def _warm_dates():
+    from dateparser.search import search_dates
+    search_dates(SAMPLE, languages=["en"], settings={"PREFER_DATES_FROM": "future"})  # dates.py's fallback
+
+
+def _warm_tokens():
+    from prompt_packer import count_tokens
+    count_tokens(SAMPLE)
+
+
+STEPS = [("imports", lambda: [importlib.import_module(m) for m in LIBRARIES]),
+         ("spacy", _warm_nlp),
+         ("dateparser", _warm_dates),
+         ("tiktoken", _warm_tokens)]
+
+
+def _run():
+    t0 = time.perf_counter()
+    for name, step in STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            _state["errors"][name] = repr(e)
+        seconds = time.perf_counter() - start
+        _state["steps"][name] = round(seconds, 3)
+        tracing.observe(f"warmup.{name}", seconds)
+    tracing.observe("warmup", time.perf_counter() - t0)
+    _state["finished_at"] = time.time()
+    _ready.set()
+
+
+def start(load_nlp=None):
+    """Start the warm-up thread once per process (no-op when disabled); returns immediately.
+
+    `load_nlp` returns the app's shared spaCy pipeline (default: pipeline.get_nlp).
+    """
+    global _thread, _load_nlp
+    with _lock:
+        if _thread is None and ENABLED:
+            _load_nlp = load_nlp or _default_nlp
+            _state["started_at"] = time.time()
+            _thread = threading.Thread(target=_run, name="warmup", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def finished():
+    return _ready.is_set()
+
+
+def ready():
+    """True once warm-up has completed without errors (always, when warm-up is disabled)."""
+    return not ENABLED or (_ready.is_set() and not _state["errors"])
+
+
+def wait(timeout=None):
+    """Block until warm-up has finished (or `timeout` seconds pass); returns ready()."""
+    if _thread is not None:
+        _ready.wait(timeout)
+    return ready()
+
+
+def record_request(seconds):
+    """Report a request's latency; the first one per process is kept as first-request latency."""
+    with _lock:
+        if _state["first_request_s"] is not None:
+            return
+        _state["first_request_s"] = round(seconds, 3)
+    tracing.observe("request.first", seconds)
+
+
+def status():
+    started, finished_at = _state["started_at"], _state["finished_at"]
+    return {"enabled": ENABLED, "ready": ready(), "finished": finished(),
+            "warmup_s": round(finished_at - started, 3) if started and finished_at else None,
+            "steps": dict(_state["steps"]), "errors": dict(_state["errors"]),
+            "first_request_s": _state["first_request_s"]}
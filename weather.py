@@ -0,0 +1,88 @@
+# weather.py - Trip-window daily forecasts from Open-Meteo
+# Only the daily variables the prompt uses are requested, only for the days of the trip, and
+# several cities (source + destination) share one request: Open-Meteo accepts comma-separated
+# coordinates and answers with one forecast per location. Days come back as compact Day tuples.
+
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+import http_transport
+
+FORECAST_URL = "https://api.open-meteo.com/v1/forecast"
+DAILY = ("weathercode", "temperature_2m_max", "temperature_2m_min", "precipitation_probability_max")
+FORECAST_DAYS = 16  # Open-Meteo's forecast horizon, today included
+DEFAULT_DAYS = 3    # window used when the trip has no return date or duration
+
+Day = namedtuple("Day", "date code tmax tmin rain")  # one per forecast day, rain = max precipitation probability %
+
+_CODES = {
+    0: "☀️ Sunny", 1: "☀️ Sunny", 2: "⛅ Partly Cloudy", 3: "⛅ Partly Cloudy",
+    45: "🌫 Foggy", 48: "🌫 Foggy", 51: "🌦 Drizzle", 53: "🌦 Drizzle", 55: "🌦 Drizzle",
+    61: "🌧 Rainy", 63: "🌧 Rainy", 65: "🌧 Rainy", 71: "❄️ Snowy", 73: "❄️ Snowy",
+    75: "❄️ Snowy", 95: "⛈ Thunderstorm", 96: "⛈ Thunderstorm", 99: "⛈ Thunderstorm"
+}
+
+
+def get_weather_emoji(code):
+    return _CODES.get(code, "☁️ Cloudy")
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        return date.fromisoformat(value[:10])
+    return None
+
+
+def trip_window(start, end=None, days=None, today=None):
+    """(first_day, last_day) of the trip clipped to the forecast horizon; None if it starts beyond it."""
+    today = today or date.today()
+    first = _as_date(start) or today
+    last = _as_date(end) or first + timedelta(days=max((days or DEFAULT_DAYS) - 1, 0))
+    first, last = max(first, today), max(last, first)
+    horizon = today + timedelta(days=FORECAST_DAYS - 1)
+    if first > horizon:
+        return None
+    return first, min(last, horizon)
+
+
+def forecast_url(coords, first, last, base_url=FORECAST_URL):
+    lat = ",".join(f"{c[0]:.4f}" for c in coords)
+    lon = ",".join(f"{c[1]:.4f}" for c in coords)
+    return (f"{base_url}?latitude={lat}&longitude={lon}&daily={','.join(DAILY)}&timezone=auto"
+            f"&start_date={_as_date(first).isoformat()}&end_date={_as_date(last).isoformat()}")
+
+
+def parse_days(payload):
+    daily = payload.get("daily", {})
+    return [Day(*row) for row in zip(daily.get("time", []), *(daily.get(v, []) for v in DAILY))]
+
+
+def fetch_daily(coords, first, last, base_url=FORECAST_URL):
+    """Daily forecasts for every (lat, lon) in `coords` over [first, last], in one request; a list of [Day] per coord."""
+    payload = http_transport.get(forecast_url(coords, first, last, base_url)).json()
+    payloads = payload if isinstance(payload, list) else [payload]  # a single location isn't wrapped in a list
+    if len(payloads) != len(coords) or any("daily" not in p for p in payloads):
+        raise ValueError(f"unexpected forecast response: {str(payload)[:200]}")
+    return [parse_days(p) for p in payloads]
+
+
+def day_label(day):
+    return _as_date(day).strftime("%a %d %b")
+
+
+def _fmt(value, unit):
+    return f"{value:.0f}{unit}" if value is not None else "?"
+
+
+def summarize(city, days):
+    """One prompt line with a short entry per day."""
+    parts = []
+    for d in days:
+        text = f"{day_label(d.date)} {get_weather_emoji(d.code)} {_fmt(d.tmin, '')}–{_fmt(d.tmax, '°C')}"
+        if d.rain:
+            text += f", rain {d.rain:.0f}%"
+        parts.append(text)
+    return f"Weather in {city}: " + "; ".join(parts) + "."